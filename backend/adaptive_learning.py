@@ -1,9 +1,13 @@
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from models import (
     UserProgress, CategoryProgress, UserAnswer, 
     QuestionCategory, DifficultyLevel, Question
 )
 from datetime import datetime
+import logging
+import random
+
+logger = logging.getLogger(__name__)
 
 class AdaptiveLearningEngine:
     """Adaptive learning engine implementing complexity progression:
@@ -18,12 +22,23 @@ class AdaptiveLearningEngine:
         DifficultyLevel.HARD,      # 3 - Proficient
         DifficultyLevel.EXTREME    # 4 - Advanced
     ]
+    # Reverse lookup: difficulty -> position in DIFFICULTY_ORDER
+    DIFFICULTY_INDEX = {level: i for i, level in enumerate(DIFFICULTY_ORDER)}
     
     # Rules - Updated for 3/4 system
     LEVEL_UP_CORRECT_REQUIRED = 3  # 3 correct from last 4
     LEVEL_UP_WINDOW = 4            # Window of 4 questions
     LEVEL_DOWN_WRONG_THRESHOLD = 2 # 2 wrong at same level to go down
     
+    # Per subcategory/level tracking state is packed into a single int:
+    #   bits 0-3  recent answers window, newest in bit 0 (1=correct)
+    #   bits 4-6  answers in the window, capped at LEVEL_UP_WINDOW
+    #   bits 7+   wrong answers at this level
+    WINDOW_MASK = (1 << LEVEL_UP_WINDOW) - 1
+    COUNT_SHIFT = 4
+    COUNT_MASK = 0b111
+    WRONG_SHIFT = 7
+    
     def __init__(self):
         pass
     
@@ -40,45 +55,41 @@ class AdaptiveLearningEngine:
         2. Apply 3/4 correct to advance, 2 wrong to go down rule
         3. Update overall statistics
         """
+        now = datetime.utcnow()
         category = question.category.value
-        subcategory = question.subcategory if hasattr(question, 'subcategory') and question.subcategory else category
+        subcategory = question.subcategory or category
+        
+        # Combined category+subcategory prefix; the level is appended per lookup
+        tracking_prefix = f"{category}:{subcategory}:"
         
-        # Create a combined key for category+subcategory tracking
-        tracking_key = f"{category}:{subcategory}"
+        category_progress = progress.category_progress
+        subcategory_tracking = progress.subcategory_tracking
+        if subcategory_tracking is None:
+            subcategory_tracking = progress.subcategory_tracking = {}
         
         # Initialize category progress if not exists
-        if category not in progress.category_progress:
-            progress.category_progress[category] = CategoryProgress(
+        cat_progress = category_progress.get(category)
+        if cat_progress is None:
+            cat_progress = category_progress[category] = CategoryProgress(
                 category=question.category,
                 current_difficulty=DifficultyLevel.EASY,
                 correct_streak=0,
                 total_answered=0,
                 total_correct=0,
-                last_updated=datetime.utcnow()
+                last_updated=now
             )
         
-        cat_progress = progress.category_progress[category]
-        
         # Track per-subcategory progress for complexity rules
         # Store recent answers per subcategory+level in a separate tracking dict
-        if not hasattr(progress, 'subcategory_tracking') or progress.subcategory_tracking is None:
-            progress.subcategory_tracking = {}
-        
-        current_level = cat_progress.current_difficulty.value
-        level_key = f"{tracking_key}:{current_level}"
+        level_key = tracking_prefix + cat_progress.current_difficulty.value
+        state = subcategory_tracking.get(level_key, 0)
+        if not isinstance(state, int):
+            state = self._upgrade_tracking(state)
+        window, count, wrong_count = self._unpack_tracking(state)
         
-        if level_key not in progress.subcategory_tracking:
-            progress.subcategory_tracking[level_key] = {
-                'recent_answers': [],  # List of booleans (True=correct, False=wrong)
-                'wrong_count_at_level': 0
-            }
-        
-        tracking = progress.subcategory_tracking[level_key]
-        
-        # Add this answer to recent answers (keep only last LEVEL_UP_WINDOW)
-        tracking['recent_answers'].append(answer.is_correct)
-        if len(tracking['recent_answers']) > self.LEVEL_UP_WINDOW:
-            tracking['recent_answers'] = tracking['recent_answers'][-self.LEVEL_UP_WINDOW:]
+        # Shift this answer into the window (keeps only last LEVEL_UP_WINDOW)
+        window = ((window << 1) | int(answer.is_correct)) & self.WINDOW_MASK
+        count = min(count + 1, self.LEVEL_UP_WINDOW)
         
         # Update category statistics
         cat_progress.total_answered += 1
@@ -93,73 +104,97 @@ class AdaptiveLearningEngine:
         else:
             cat_progress.correct_streak = 0
             progress.current_streak = 0
-            tracking['wrong_count_at_level'] += 1
+            wrong_count += 1
         
-        # Apply adaptive difficulty logic
-        cat_progress, level_changed = self._apply_adaptive_logic(
+        # Apply adaptive difficulty logic (updates cat_progress in place)
+        level_changed = self._apply_adaptive_logic(
             cat_progress, 
-            tracking,
-            answer.is_correct
+            window,
+            count,
+            wrong_count,
+            now
         )
         
         # If level changed, reset tracking for new level
         if level_changed:
-            new_level_key = f"{tracking_key}:{cat_progress.current_difficulty.value}"
-            if new_level_key not in progress.subcategory_tracking:
-                progress.subcategory_tracking[new_level_key] = {
-                    'recent_answers': [],
-                    'wrong_count_at_level': 0
-                }
+            new_level_key = tracking_prefix + cat_progress.current_difficulty.value
+            subcategory_tracking.setdefault(new_level_key, 0)
             # Reset wrong count for old level
-            tracking['wrong_count_at_level'] = 0
+            wrong_count = 0
+        
+        subcategory_tracking[level_key] = self._pack_tracking(window, count, wrong_count)
         
         # Update global statistics
         progress.total_questions_answered += 1
         if answer.is_correct:
             progress.total_correct += 1
         progress.total_time_spent += answer.time_taken
-        progress.last_activity = datetime.utcnow()
-        
-        # Update category progress
-        progress.category_progress[category] = cat_progress
+        progress.last_activity = now
         
         return progress
     
+    def _pack_tracking(self, window: int, count: int, wrong_count: int) -> int:
+        """Pack tracking fields into a single int (see WINDOW_MASK layout)"""
+        return window | (count << self.COUNT_SHIFT) | (wrong_count << self.WRONG_SHIFT)
+    
+    def _unpack_tracking(self, state: int) -> Tuple[int, int, int]:
+        """Unpack a tracking int into (window, count, wrong_count)"""
+        return (
+            state & self.WINDOW_MASK,
+            (state >> self.COUNT_SHIFT) & self.COUNT_MASK,
+            state >> self.WRONG_SHIFT
+        )
+    
+    def _upgrade_tracking(self, tracking: dict) -> int:
+        """Convert a legacy dict tracking record ('recent_answers' list) to the packed int layout"""
+        wrong_count = tracking.get('wrong_count_at_level', 0)
+        recent = (tracking.get('recent_answers') or [])[-self.LEVEL_UP_WINDOW:]
+        window = 0
+        for is_correct in recent:
+            window = (window << 1) | int(bool(is_correct))
+        return self._pack_tracking(window, len(recent), wrong_count)
+    
     def _apply_adaptive_logic(
         self, 
         cat_progress: CategoryProgress, 
-        tracking: dict,
-        is_correct: bool
-    ) -> tuple:
+        window: int,
+        count: int,
+        wrong_count: int,
+        now: datetime = None
+    ) -> bool:
         """Apply complexity progression rules:
         - 3 correct from last 4 questions to advance
         - 2 wrong at same level to go down (unless at foundational)
         
-        Returns: (updated_progress, level_changed)
+        Updates cat_progress in place. Returns: level_changed
         """
-        current_index = self.DIFFICULTY_ORDER.index(cat_progress.current_difficulty)
+        current_index = self.DIFFICULTY_INDEX[cat_progress.current_difficulty]
         level_changed = False
         
-        recent = tracking['recent_answers']
-        
         # Check for level UP: 3 correct from last 4
-        if len(recent) >= self.LEVEL_UP_WINDOW:
-            correct_count = sum(recent[-self.LEVEL_UP_WINDOW:])
+        if count >= self.LEVEL_UP_WINDOW:
+            correct_count = window.bit_count()
             if correct_count >= self.LEVEL_UP_CORRECT_REQUIRED:
                 if current_index < len(self.DIFFICULTY_ORDER) - 1:
                     cat_progress.current_difficulty = self.DIFFICULTY_ORDER[current_index + 1]
                     level_changed = True
-                    print(f"Level UP! Now at {cat_progress.current_difficulty.value} (got {correct_count}/{self.LEVEL_UP_WINDOW} correct)")
+                    logger.debug(
+                        "Level UP! Now at %s (got %d/%d correct)",
+                        cat_progress.current_difficulty.value, correct_count, self.LEVEL_UP_WINDOW
+                    )
         
         # Check for level DOWN: 2 wrong at same level
-        if not level_changed and tracking['wrong_count_at_level'] >= self.LEVEL_DOWN_WRONG_THRESHOLD:
+        if not level_changed and wrong_count >= self.LEVEL_DOWN_WRONG_THRESHOLD:
             if current_index > 0:  # Don't go below foundational
                 cat_progress.current_difficulty = self.DIFFICULTY_ORDER[current_index - 1]
                 level_changed = True
-                print(f"Level DOWN! Now at {cat_progress.current_difficulty.value} (got {tracking['wrong_count_at_level']} wrong)")
+                logger.debug(
+                    "Level DOWN! Now at %s (got %d wrong)",
+                    cat_progress.current_difficulty.value, wrong_count
+                )
         
-        cat_progress.last_updated = datetime.utcnow()
-        return cat_progress, level_changed
+        cat_progress.last_updated = now or datetime.utcnow()
+        return level_changed
     
     def get_next_questions(
         self, 
@@ -185,17 +220,16 @@ class AdaptiveLearningEngine:
                 target_difficulty = DifficultyLevel.EASY
             
             filtered = [
-                q for q in available_questions 
+                q for q in available_questions
                 if q.category == category and q.difficulty == target_difficulty
             ]
         else:
             # Select from multiple categories based on progress
             filtered = self._select_adaptive_questions(progress, available_questions)
         
-        # Limit to requested count
-        import random
-        random.shuffle(filtered)
-        return filtered[:count]
+        # Random pick limited to requested count (leaves the source list untouched)
+        k = min(count, len(filtered))
+        return random.sample(filtered, k) if k > 0 else []
     
     def _select_adaptive_questions(
         self, 
@@ -204,6 +238,7 @@ class AdaptiveLearningEngine:
     ) -> List[Question]:
         """Select questions adaptively across categories"""
         selected = []
+        index = self._get_question_index(available_questions)
         
         # Get categories sorted by performance (weakest first)
         categories_by_performance = self._get_categories_by_performance(progress)
@@ -216,15 +251,20 @@ class AdaptiveLearningEngine:
                 target_difficulty = DifficultyLevel.EASY
             
             # Find questions for this category and difficulty
-            category_questions = [
-                q for q in available_questions
-                if q.category.value == category_name and q.difficulty == target_difficulty
-            ]
-            
-            selected.extend(category_questions)
+            selected.extend(index.get((category_name, target_difficulty), ()))
         
         return selected
     
+    def _get_question_index(
+        self,
+        available_questions: List[Question]
+    ) -> Dict[Tuple[str, DifficultyLevel], List[Question]]:
+        """Group questions by (category, difficulty) in a single pass"""
+        index: Dict[Tuple[str, DifficultyLevel], List[Question]] = {}
+        for q in available_questions:
+            index.setdefault((q.category.value, q.difficulty), []).append(q)
+        return index
+    
     def _get_categories_by_performance(self, progress: UserProgress) -> List[str]:
         """Get categories sorted by performance (weakest first)"""
         category_scores = {}
@@ -1,40 +1,142 @@
-import os
-from typing import List, Dict
+import asyncio
+import logging
+from typing import List, Optional, Tuple
 from emergentintegrations.llm.chat import LlmChat, UserMessage
-from models import Question, QuestionCategory, DifficultyLevel, AIGenerationRequest
+from models import Question, GeneratedQuestion, DifficultyLevel, AIGenerationRequest
+from pydantic import ValidationError
 import json
-import re
-import uuid
+import orjson
+import secrets
 from datetime import datetime
-from pathlib import Path
-from dotenv import load_dotenv
+from config import EMERGENT_LLM_KEY
 
-# Load environment variables
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+logger = logging.getLogger(__name__)
+
+def _extract_json_array(text: str) -> str:
+    """Return the first balanced JSON array in text, or text unchanged
+    
+    Single forward pass tracking bracket depth and string state, so large
+    or malformed LLM output cannot trigger regex backtracking.
+    """
+    start = text.find('[')
+    if start == -1:
+        return text
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == '[':
+            depth += 1
+        elif ch == ']':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    
+    return text
 
 class AIService:
     """AI service for generating medical MCQs using LLM"""
     
+    # Largest number of questions asked of the LLM in a single call;
+    # bigger requests are split and the calls run concurrently
+    QUESTIONS_PER_CALL = 10
+    
+    # Each call of a split request is steered to a different angle on the material,
+    # so concurrent calls don't come back with the same questions
+    CHUNK_FOCUSES = [
+        "pathophysiology and underlying mechanisms",
+        "clinical presentation and diagnosis",
+        "investigations and their interpretation",
+        "management and pharmacology",
+        "complications, prognosis and prevention",
+    ]
+    
     def __init__(self):
-        self.api_key = os.getenv("EMERGENT_LLM_KEY")
+        self.api_key = EMERGENT_LLM_KEY
         self.model = "gpt-5.1"
         self.provider = "openai"
+        self._system_message = self._create_system_prompt()
     
     async def generate_questions(self, request: AIGenerationRequest, user_id: str) -> List[Question]:
-        """Generate medical MCQ questions from user's study materials"""
+        """Generate medical MCQ questions from user's study materials
         
-        # Create system prompt
-        system_message = self._create_system_prompt()
+        Requests for more than QUESTIONS_PER_CALL questions are split into
+        smaller calls, each with its own focus, that run concurrently, so
+        wall-clock time tracks the slowest call rather than the sum of them.
+        If any call fails the whole request fails, as a single call would.
+        Questions with the same text are returned once, so the result can be
+        shorter than request.question_count.
+        """
+        chunks = self._split_request(request)
+        if len(chunks) == 1:
+            questions = await self._generate_chunk(request, user_id)
+        else:
+            results = await asyncio.gather(
+                *(self._generate_chunk(chunk, user_id, focus) for chunk, focus in chunks)
+            )
+            questions = [question for result in results for question in result]
         
+        return self._dedup_questions(questions)
+    
+    def _split_request(self, request: AIGenerationRequest) -> List[Tuple[AIGenerationRequest, Optional[str]]]:
+        """Split a request into (chunk, focus) pairs of at most QUESTIONS_PER_CALL questions"""
+        if request.question_count <= self.QUESTIONS_PER_CALL:
+            return [(request, None)]
+        
+        full_chunks, remainder = divmod(request.question_count, self.QUESTIONS_PER_CALL)
+        counts = [self.QUESTIONS_PER_CALL] * full_chunks
+        if remainder:
+            counts.append(remainder)
+        return [
+            (
+                request.model_copy(update={"question_count": count}),
+                self.CHUNK_FOCUSES[i % len(self.CHUNK_FOCUSES)]
+            )
+            for i, count in enumerate(counts)
+        ]
+    
+    def _dedup_questions(self, questions: List[Question]) -> List[Question]:
+        """Drop questions whose text (ignoring case and whitespace) was already seen"""
+        seen = set()
+        unique = []
+        for question in questions:
+            key = " ".join(question.question.casefold().split())
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(question)
+        
+        if len(unique) < len(questions):
+            logger.info("Dropped %d duplicate AI questions", len(questions) - len(unique))
+        return unique
+    
+    async def _generate_chunk(
+        self,
+        request: AIGenerationRequest,
+        user_id: str,
+        focus: Optional[str] = None
+    ) -> List[Question]:
+        """Run a single LLM call and return its validated questions"""
         # Create user prompt
-        user_prompt = self._create_user_prompt(request)
+        user_prompt = self._create_user_prompt(request, focus)
         
-        # Initialize LLM chat
+        # Each call gets its own chat: LlmChat keeps per-session message
+        # history, so instances must not be shared between users or calls
         chat = LlmChat(
             api_key=self.api_key,
-            session_id=f"user_{user_id}_{uuid.uuid4()}",
-            system_message=system_message
+            session_id=f"user_{user_id}_{secrets.token_hex(8)}",
+            system_message=self._system_message
         ).with_model(self.provider, self.model)
         
         # Send message and get response
@@ -64,7 +166,7 @@ Your task is to generate medical MCQ questions that:
 
 IMPORTANT: Return ONLY a valid JSON array, no additional text."""
     
-    def _create_user_prompt(self, request: AIGenerationRequest) -> str:
+    def _create_user_prompt(self, request: AIGenerationRequest, focus: Optional[str] = None) -> str:
         """Create the user prompt with context and requirements"""
         difficulty_desc = {
             DifficultyLevel.EASY: "basic recall and simple application",
@@ -73,10 +175,12 @@ IMPORTANT: Return ONLY a valid JSON array, no additional text."""
             DifficultyLevel.EXTREME: "rare conditions or highly complex multi-step reasoning"
         }
         
+        focus_line = f"\nFocus: questions on {focus}" if focus else ""
+        
         return f"""Generate {request.question_count} medical MCQ questions on the topic: {request.topic}
 
 Difficulty Level: {difficulty_desc.get(request.difficulty, 'medium')}
-Category: {request.category.value}
+Category: {request.category.value}{focus_line}
 
 Study Materials:
 {request.context}
@@ -100,89 +204,59 @@ Rules:
 5. Return ONLY the JSON array, nothing else"""
     
     def _parse_ai_response(self, response: str, request: AIGenerationRequest, user_id: str) -> List[Question]:
-        """Parse AI response into Question objects"""
+        """Parse AI response into Question objects
+        
+        Items failing GeneratedQuestion's rule-based checks are skipped.
+        """
         try:
             # Extract JSON from response
-            json_match = re.search(r'\[.*\]', response, re.DOTALL)
-            if json_match:
-                response = json_match.group(0)
+            response = _extract_json_array(response)
             
-            # Parse JSON
-            questions_data = json.loads(response)
+            # Parse JSON (stdlib fallback accepts NaN/Infinity, which orjson rejects)
+            try:
+                questions_data = orjson.loads(response)
+            except orjson.JSONDecodeError:
+                questions_data = json.loads(response)
             
             questions = []
             for q_data in questions_data:
-                question = Question(
-                    id=str(uuid.uuid4()),
-                    question=q_data["question"],
-                    options=q_data["options"],
-                    correct_answer=q_data["correct_answer"],
-                    explanation=q_data["explanation"],
-                    category=request.category,
-                    year=2,  # Default to Year 2
-                    difficulty=request.difficulty,
-                    user_id=user_id,
-                    source="ai-generated",
-                    created_at=datetime.utcnow(),
-                    verified=False
-                )
+                try:
+                    # id comes from the model's pooled default factory
+                    question = GeneratedQuestion(
+                        question=q_data["question"],
+                        options=q_data["options"],
+                        correct_answer=q_data["correct_answer"],
+                        explanation=q_data["explanation"],
+                        category=request.category,
+                        year=2,  # Default to Year 2
+                        difficulty=request.difficulty,
+                        user_id=user_id,
+                        source="ai-generated",
+                        created_at=datetime.utcnow(),
+                        verified=False
+                    )
+                except (KeyError, TypeError, ValidationError) as e:
+                    logger.debug("Skipping invalid AI question: %s", e)
+                    continue
                 questions.append(question)
             
             return questions
         
         except Exception as e:
-            print(f"Error parsing AI response: {e}")
-            print(f"Response: {response}")
+            logger.error("Error parsing AI response: %s", e)
+            logger.debug("Response: %s", response)
             return []
     
     def _validate_questions(self, questions: List[Question]) -> List[Question]:
-        """Validate questions using rule-based validation
+        """Mark parsed questions as verified
         
-        Rule-based validation:
-        1. Question must be at least 50 characters
-        2. Must have 4-5 options
-        3. Correct answer index must be valid
-        4. Explanation must be at least 50 characters
-        5. No duplicate options
-        6. Options must not be empty
+        The rule-based checks run when each GeneratedQuestion is built in
+        _parse_ai_response, so every question reaching here has passed them.
         """
-        validated = []
-        
         for question in questions:
-            try:
-                # Rule 1: Question length
-                if len(question.question) < 50:
-                    continue
-                
-                # Rule 2: Number of options
-                if len(question.options) < 4 or len(question.options) > 5:
-                    continue
-                
-                # Rule 3: Valid correct answer
-                if question.correct_answer < 0 or question.correct_answer >= len(question.options):
-                    continue
-                
-                # Rule 4: Explanation length
-                if len(question.explanation) < 50:
-                    continue
-                
-                # Rule 5: No duplicate options
-                if len(question.options) != len(set(question.options)):
-                    continue
-                
-                # Rule 6: No empty options
-                if any(not opt.strip() for opt in question.options):
-                    continue
-                
-                # Mark as verified (passed rule-based validation)
-                question.verified = True
-                validated.append(question)
-            
-            except Exception as e:
-                print(f"Error validating question: {e}")
-                continue
+            question.verified = True
         
-        return validated
+        return questions
 
 # Global instance
 ai_service = AIService()
\ No newline at end of file
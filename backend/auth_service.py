@@ -3,32 +3,87 @@ from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import os
-from typing import Optional
+import secrets
+import time
+from functools import lru_cache
+from typing import Optional, Tuple
+from cachetools import TLRUCache
 from models import TokenData
-from pathlib import Path
-from dotenv import load_dotenv
+from config import (
+    JWT_SECRET_KEY, JWT_ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
+)
 
-# Load environment variables
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# New hashes use argon2id with the OWASP-recommended parameters (64 MiB, 3 passes,
+# 2 lanes); existing bcrypt hashes, and argon2 hashes made with other parameters,
+# still verify and are flagged for rehash so they upgrade on next login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    default="argon2",
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__memory_cost=65536,
+    argon2__time_cost=3,
+    argon2__parallelism=2
+)
 security = HTTPBearer()
 
-JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
-JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
-REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+# Recently decoded tokens -> (TokenData, exp). Entries live for at most
+# TOKEN_CACHE_TTL_SECONDS and never past the token's own expiry.
+TOKEN_CACHE_TTL_SECONDS = 60
+_token_cache = TLRUCache(
+    maxsize=10_000,
+    ttu=lambda _token, entry, now: min(now + TOKEN_CACHE_TTL_SECONDS, entry[1]),
+    timer=time.time
+)
 
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt"""
+    """Hash a password using argon2id"""
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a replacement hash if the stored one is outdated
+    
+    Returns: (is_valid, new_hash) where new_hash is None unless a rehash is needed
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# Hashing is deliberately slow CPU work, so the async variants run it in the threadpool,
+# at most one per core at a time: a login flood queues here instead of filling the pool
+_hash_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+
+async def hash_password_async(password: str) -> str:
+    """hash_password off the event loop"""
+    async with _hash_semaphore:
+        return await run_in_threadpool(hash_password, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password off the event loop"""
+    async with _hash_semaphore:
+        return await run_in_threadpool(verify_and_update_password, plain_password, hashed_password)
+
+@lru_cache(maxsize=1)
+def _dummy_password_hash() -> str:
+    return hash_password(secrets.token_urlsafe(16))
+
+def _verify_dummy_password(plain_password: str) -> bool:
+    return verify_password(plain_password, _dummy_password_hash())
+
+async def verify_dummy_password_async(plain_password: str) -> None:
+    """Spend the same hashing time as a real check when there is no user to check against
+    
+    Keeps unknown-email logins from answering measurably faster than wrong passwords.
+    """
+    async with _hash_semaphore:
+        await run_in_threadpool(_verify_dummy_password, plain_password)
+
 def create_token(data: dict, expires_delta: timedelta) -> str:
     """Create a JWT token"""
     to_encode = data.copy()
@@ -48,7 +103,15 @@ def create_refresh_token(user_id: str) -> str:
     return create_token({"sub": user_id, "type": "refresh"}, expires_delta)
 
 def decode_token(token: str) -> TokenData:
-    """Decode and validate a JWT token"""
+    """Decode and validate a JWT token
+    
+    Successful decodes are cached briefly so repeat requests with the same
+    token skip signature verification.
+    """
+    cached = _token_cache.get(token)
+    if cached is not None:
+        return cached[0]
+    
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
         user_id: str = payload.get("sub")
@@ -57,7 +120,11 @@ def decode_token(token: str) -> TokenData:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token"
             )
-        return TokenData(user_id=user_id)
+        token_data = TokenData(user_id=user_id)
+        exp = payload.get("exp")
+        if exp is not None:
+            _token_cache[token] = (token_data, float(exp))
+        return token_data
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -3,21 +3,38 @@ Email Client Service for MedMCQ Admin
 Full IMAP/SMTP client for support@medmcq.com.au
 """
 
+import html
 import imaplib
 import smtplib
-import ssl
 import email
+from email import policy
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.header import decode_header
-from email.utils import parsedate_to_datetime, formatdate
+from email.utils import parsedate_to_datetime, formatdate, parseaddr
 import os
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime
 from typing import List, Dict, Optional
+from collections import OrderedDict
+from contextlib import contextmanager
+import queue
+import threading
+import time
 import re
+import string
+from email_service import SSL_CONTEXT, smtp_pool
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 # Load environment variables
 load_dotenv(Path(__file__).parent / '.env')
@@ -27,31 +44,180 @@ logger = logging.getLogger(__name__)
 # Email configuration
 IMAP_HOST = os.environ.get('IMAP_HOST', 'imap.zoho.com')
 IMAP_PORT = int(os.environ.get('IMAP_PORT', '993'))
-SMTP_HOST = os.environ.get('SMTP_HOST', 'smtp.zoho.com')
-SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
 SUPPORT_EMAIL = os.environ.get('SUPPORT_EMAIL', 'support@medmcq.com.au')
 SUPPORT_PASSWORD = os.environ.get('SUPPORT_EMAIL_PASSWORD', '')
+IMAP_POOL_SIZE = int(os.environ.get('IMAP_POOL_SIZE', '4'))
+IMAP_POOL_IDLE_TIMEOUT = int(os.environ.get('IMAP_POOL_IDLE_TIMEOUT', '300'))  # seconds
+IMAP_POOL_ACQUIRE_TIMEOUT = int(os.environ.get('IMAP_POOL_ACQUIRE_TIMEOUT', '15'))  # seconds
+NOFILE_SOFT_LIMIT = 4096
+PREVIEW_FETCH_BYTES = 4096  # body bytes fetched per message for the inbox preview
+UNREAD_COUNT_TTL = 30  # seconds
+
+_FETCH_SEQ_RE = re.compile(rb'^(\d+) \(')
+_FETCH_UID_RE = re.compile(rb'UID (\d+)')
+_FETCH_FLAGS_RE = re.compile(rb'FLAGS \(([^)]*)\)')
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+
+
+def _raise_nofile_limit(target: int = NOFILE_SOFT_LIMIT):
+    """Raise the soft open-file limit towards target (never lowers it)"""
+    if resource is None:
+        return
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = target if hard == resource.RLIM_INFINITY else min(hard, target)
+        if soft != resource.RLIM_INFINITY and soft < wanted:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+    except (ValueError, OSError) as e:
+        logger.warning(f"Could not raise open file limit: {e}")
+
 
+_raise_nofile_limit()
 
-def decode_email_header(header_value):
-    """Decode email header handling various encodings"""
-    if not header_value:
-        return ""
+
+class ImapPoolExhausted(Exception):
+    """All pooled IMAP connections stayed busy for IMAP_POOL_ACQUIRE_TIMEOUT"""
+
+
+class _ImapPool:
+    """Bounded pool of logged-in IMAP connections to the support mailbox
     
-    decoded_parts = []
-    for part, charset in decode_header(header_value):
-        if isinstance(part, bytes):
-            try:
-                decoded_parts.append(part.decode(charset or 'utf-8', errors='replace'))
-            except:
-                decoded_parts.append(part.decode('utf-8', errors='replace'))
+    Saves a TLS handshake and LOGIN per call. Idle connections older than
+    idle_timeout are dropped, and reused ones are checked with NOOP first.
+    """
+    
+    def __init__(
+        self,
+        max_size: int = IMAP_POOL_SIZE,
+        idle_timeout: int = IMAP_POOL_IDLE_TIMEOUT,
+        acquire_timeout: int = IMAP_POOL_ACQUIRE_TIMEOUT
+    ):
+        self._idle = queue.LifoQueue(maxsize=max_size)  # (connection, last_used)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle_timeout = idle_timeout
+        self._acquire_timeout = acquire_timeout
+    
+    @staticmethod
+    def _connect():
+        mail = imaplib.IMAP4_SSL(IMAP_HOST, IMAP_PORT, ssl_context=SSL_CONTEXT)
+        mail.login(SUPPORT_EMAIL, SUPPORT_PASSWORD)
+        return mail
+    
+    @staticmethod
+    def _close(mail):
+        try:
+            mail.logout()
+        except Exception:
+            pass
+    
+    def acquire(self):
+        """Take a healthy connection from the pool, or open a new one"""
+        if not self._slots.acquire(timeout=self._acquire_timeout):
+            raise ImapPoolExhausted("No IMAP connection became free in time")
+        try:
+            while True:
+                try:
+                    mail, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                
+                if time.monotonic() - last_used > self._idle_timeout:
+                    self._close(mail)
+                    continue
+                try:
+                    if mail.noop()[0] == 'OK':
+                        return mail
+                except (imaplib.IMAP4.error, OSError):
+                    pass
+                self._close(mail)
+        except BaseException:
+            self._slots.release()
+            raise
+    
+    def release(self, mail, healthy: bool = True):
+        """Return a connection to the pool (or close it if it is broken)"""
+        try:
+            if healthy:
+                try:
+                    self._idle.put_nowait((mail, time.monotonic()))
+                    return
+                except queue.Full:
+                    pass
+            self._close(mail)
+        finally:
+            self._slots.release()
+    
+    @contextmanager
+    def get(self):
+        mail = self.acquire()
+        try:
+            yield mail
+        except (imaplib.IMAP4.error, OSError):
+            self.release(mail, healthy=False)
+            raise
+        except BaseException:
+            self.release(mail)
+            raise
         else:
-            decoded_parts.append(part)
-    return ' '.join(decoded_parts)
+            self.release(mail)
+
+
+_imap_pool = _ImapPool()
+
+# Last unread count seen on the server; dashboards poll this frequently
+_unread_cache = {"count": 0, "ts": None}
+
+# Recently opened messages, keyed by (folder, uid); opening then replying
+# to a message would otherwise download and parse it twice
+EMAIL_CACHE_SIZE = 256
+_email_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+_email_cache_lock = threading.Lock()
+
+
+def _email_cache_get(key) -> Optional[Dict]:
+    with _email_cache_lock:
+        entry = _email_cache.get(key)
+        if entry is not None:
+            _email_cache.move_to_end(key)
+        return entry
+
+
+def _email_cache_put(key, email_data: Dict):
+    with _email_cache_lock:
+        _email_cache[key] = email_data
+        _email_cache.move_to_end(key)
+        while len(_email_cache) > EMAIL_CACHE_SIZE:
+            _email_cache.popitem(last=False)
+
+
+def _fetched_message_id(msg_data) -> str:
+    """Message-ID from a BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)] response"""
+    for item in msg_data:
+        if isinstance(item, tuple) and item[1]:
+            return str(email.message_from_bytes(item[1], policy=policy.default).get('Message-ID', ''))
+    return ""
+
+
+def _strip_html(html_body: str) -> str:
+    """Reduce an HTML body to whitespace-normalised plain text"""
+    text = None
+    if lxml_html is not None:
+        try:
+            text = lxml_html.fromstring(html_body).text_content()
+        except Exception:
+            # Empty documents, or strings carrying an XML encoding declaration
+            text = None
+    if text is None:
+        text = _TAG_RE.sub('', html_body)
+    return _WS_RE.sub(' ', text).strip()
 
 
-def get_email_body(msg):
-    """Extract plain text body from email message"""
+def get_email_body(msg, max_bytes: Optional[int] = None):
+    """Extract plain text body from email message
+    
+    max_bytes caps how much of the chosen part is decoded (for previews).
+    """
     body = ""
     
     if msg.is_multipart():
@@ -68,7 +234,7 @@ def get_email_body(msg):
                     charset = part.get_content_charset() or 'utf-8'
                     payload = part.get_payload(decode=True)
                     if payload:
-                        body = payload.decode(charset, errors='replace')
+                        body = payload[:max_bytes].decode(charset, errors='replace')
                         break
                 except Exception as e:
                     logger.error(f"Error decoding email part: {e}")
@@ -78,10 +244,8 @@ def get_email_body(msg):
                     charset = part.get_content_charset() or 'utf-8'
                     payload = part.get_payload(decode=True)
                     if payload:
-                        html_body = payload.decode(charset, errors='replace')
-                        # Strip HTML tags for plain text
-                        body = re.sub(r'<[^>]+>', '', html_body)
-                        body = re.sub(r'\s+', ' ', body).strip()
+                        html_body = payload[:max_bytes].decode(charset, errors='replace')
+                        body = _strip_html(html_body)
                 except Exception as e:
                     logger.error(f"Error decoding HTML part: {e}")
     else:
@@ -89,28 +253,77 @@ def get_email_body(msg):
             charset = msg.get_content_charset() or 'utf-8'
             payload = msg.get_payload(decode=True)
             if payload:
-                body = payload.decode(charset, errors='replace')
+                body = payload[:max_bytes].decode(charset, errors='replace')
         except Exception as e:
             logger.error(f"Error decoding email body: {e}")
     
     return body.strip()
 
 
+def _header_address(header) -> Dict[str, str]:
+    """Name/email dict from an address header parsed with policy.default"""
+    addresses = getattr(header, 'addresses', None)
+    if not addresses:
+        return parse_email_address(str(header) if header else "")
+    if len(addresses) == 1:
+        return {"name": addresses[0].display_name, "email": addresses[0].addr_spec}
+    return {"name": "", "email": ", ".join(addr.addr_spec for addr in addresses)}
+
+
+def get_email_preview(msg, limit: int = 150) -> str:
+    """Short plain-text preview for the inbox list, decoding only the start of the body"""
+    body = get_email_body(msg, max_bytes=PREVIEW_FETCH_BYTES)
+    return (body[:limit] + "...") if len(body) > limit else body
+
+
 def parse_email_address(addr_string):
     """Parse email address from header"""
     if not addr_string:
         return {"name": "", "email": ""}
     
-    # Handle "Name <email@domain.com>" format
-    match = re.match(r'^(.*?)\s*<(.+?)>$', addr_string.strip())
-    if match:
-        name = match.group(1).strip().strip('"\'')
-        email_addr = match.group(2).strip()
-    else:
-        name = ""
-        email_addr = addr_string.strip()
+    # Handles "Name <email@domain.com>", quoted names and bare addresses
+    name, email_addr = parseaddr(addr_string)
+    if not email_addr:
+        return {"name": "", "email": addr_string.strip()}
     
-    return {"name": name, "email": email_addr}
+    return {"name": name.strip().strip('"\''), "email": email_addr.strip()}
+
+
+def _group_fetch_response(msg_data) -> Dict[str, Dict]:
+    """Group a multi-message FETCH response by sequence number
+    
+    imaplib returns each message as a run of (prefix, literal) tuples followed
+    by a closing bytes item; UID and FLAGS may appear in any of the prefixes.
+    """
+    messages = {}
+    current = None
+    
+    for item in msg_data:
+        prefix = item[0] if isinstance(item, tuple) else item
+        if not isinstance(prefix, bytes):
+            continue
+        
+        match = _FETCH_SEQ_RE.match(prefix)
+        if match:
+            current = messages.setdefault(match.group(1).decode(), {"uid": "", "flags": "", "header": b"", "text": b""})
+        if current is None:
+            continue
+        
+        uid = _FETCH_UID_RE.search(prefix)
+        if uid:
+            current["uid"] = uid.group(1).decode()
+        
+        flags = _FETCH_FLAGS_RE.search(prefix)
+        if flags:
+            current["flags"] = flags.group(1).decode()
+        
+        if isinstance(item, tuple):
+            if b'BODY[HEADER]' in prefix:
+                current["header"] = item[1] or b""
+            elif b'BODY[TEXT]' in prefix:
+                current["text"] = item[1] or b""
+    
+    return messages
 
 
 def fetch_emails(folder: str = "INBOX", limit: int = 50) -> List[Dict]:
@@ -131,47 +344,44 @@ def fetch_emails(folder: str = "INBOX", limit: int = 50) -> List[Dict]:
     emails = []
     
     try:
-        # Connect to IMAP
-        context = ssl.create_default_context()
-        mail = imaplib.IMAP4_SSL(IMAP_HOST, IMAP_PORT, ssl_context=context)
-        mail.login(SUPPORT_EMAIL, SUPPORT_PASSWORD)
-        
-        # Select folder (Zoho uses "Sent" for sent items)
-        folder_name = folder if folder == "INBOX" else "Sent"
-        status, messages = mail.select(folder_name, readonly=True)
-        
-        if status != 'OK':
-            logger.error(f"Failed to select folder {folder_name}")
-            mail.logout()
-            return []
-        
-        # Search for all emails
-        status, message_ids = mail.search(None, 'ALL')
-        
-        if status != 'OK':
-            mail.logout()
-            return []
+        with _imap_pool.get() as mail:
+            # Select folder (Zoho uses "Sent" for sent items)
+            folder_name = folder if folder == "INBOX" else "Sent"
+            status, messages = mail.select(folder_name, readonly=True)
+            
+            if status != 'OK':
+                logger.error(f"Failed to select folder {folder_name}")
+                return []
+            
+            # SELECT reports the message count; sequence numbers follow arrival order,
+            # so the newest `limit` messages are simply the last `limit` numbers
+            total = int(messages[0] or 0)
+            if total == 0 or limit <= 0:
+                return []
+            
+            # One round trip for the whole page: UID, flags, headers and the start of the body
+            status, msg_data = mail.fetch(
+                f'{max(1, total - limit + 1)}:{total}',
+                f'(UID FLAGS BODY.PEEK[HEADER] BODY.PEEK[TEXT]<0.{PREVIEW_FETCH_BYTES}>)'
+            )
+            
+            if status != 'OK':
+                return []
         
-        # Get message IDs (most recent first)
-        ids = message_ids[0].split()
-        ids = list(reversed(ids))[:limit]  # Reverse for newest first
+        messages = _group_fetch_response(msg_data)
         
-        for msg_id in ids:
+        # Newest first
+        for seq in sorted(messages, key=int, reverse=True):
+            parts = messages[seq]
+            msg_id = parts["uid"] or seq
             try:
-                status, msg_data = mail.fetch(msg_id, '(RFC822 FLAGS)')
                 
-                if status != 'OK':
-                    continue
-                
-                raw_email = msg_data[0][1]
-                msg = email.message_from_bytes(raw_email)
-                
-                # Parse flags (for read/unread status)
-                flags = msg_data[0][0].decode() if msg_data[0][0] else ""
-                is_read = "\\Seen" in flags
+                # Headers plus a truncated body is enough for the list view
+                msg = email.message_from_bytes(parts["header"] + parts["text"], policy=policy.default)
+                is_read = "\\Seen" in parts["flags"]
                 
                 # Parse date
-                date_str = msg.get('Date', '')
+                date_str = str(msg.get('Date', ''))
                 try:
                     date_obj = parsedate_to_datetime(date_str)
                     date_formatted = date_obj.strftime('%Y-%m-%d %H:%M')
@@ -179,17 +389,17 @@ def fetch_emails(folder: str = "INBOX", limit: int = 50) -> List[Dict]:
                     date_formatted = date_str
                 
                 # Parse sender/recipient
-                from_addr = parse_email_address(decode_email_header(msg.get('From', '')))
-                to_addr = parse_email_address(decode_email_header(msg.get('To', '')))
+                from_addr = _header_address(msg['From'])
+                to_addr = _header_address(msg['To'])
                 
                 email_data = {
-                    "id": msg_id.decode(),
-                    "subject": decode_email_header(msg.get('Subject', '(No Subject)')),
+                    "id": msg_id,
+                    "subject": str(msg.get('Subject', '(No Subject)')),
                     "from": from_addr,
                     "to": to_addr,
                     "date": date_formatted,
                     "is_read": is_read,
-                    "preview": get_email_body(msg)[:150] + "..." if len(get_email_body(msg)) > 150 else get_email_body(msg),
+                    "preview": get_email_preview(msg),
                     "folder": folder
                 }
                 
@@ -199,8 +409,6 @@ def fetch_emails(folder: str = "INBOX", limit: int = 50) -> List[Dict]:
                 logger.error(f"Error parsing email {msg_id}: {e}")
                 continue
         
-        mail.logout()
-        
     except imaplib.IMAP4.error as e:
         logger.error(f"IMAP error: {e}")
     except Exception as e:
@@ -211,62 +419,88 @@ def fetch_emails(folder: str = "INBOX", limit: int = 50) -> List[Dict]:
 
 def fetch_email_by_id(email_id: str, folder: str = "INBOX") -> Optional[Dict]:
     """
-    Fetch a single email by ID with full body
+    Fetch a single email by UID (as listed by fetch_emails) with full body
     """
     if not SUPPORT_PASSWORD:
         logger.error("Support email password not configured")
         return None
     
+    cache_key = (folder, email_id)
+    cached = _email_cache_get(cache_key)
+    
     try:
-        context = ssl.create_default_context()
-        mail = imaplib.IMAP4_SSL(IMAP_HOST, IMAP_PORT, ssl_context=context)
-        mail.login(SUPPORT_EMAIL, SUPPORT_PASSWORD)
-        
-        folder_name = folder if folder == "INBOX" else "Sent"
-        mail.select(folder_name)
-        
-        status, msg_data = mail.fetch(email_id.encode(), '(RFC822)')
-        
-        if status != 'OK':
-            mail.logout()
-            return None
-        
-        # Mark as read
-        mail.store(email_id.encode(), '+FLAGS', '\\Seen')
+        with _imap_pool.get() as mail:
+            folder_name = folder if folder == "INBOX" else "Sent"
+            mail.select(folder_name)
+            
+            if cached is not None:
+                # UIDs can be reassigned if the server resets UIDVALIDITY, so confirm
+                # it is still the same message before serving it from the cache
+                status, header_data = mail.uid('FETCH', email_id, '(BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])')
+                if status == 'OK' and _fetched_message_id(header_data) == cached["message_id"]:
+                    mail.uid('STORE', email_id, '+FLAGS', '\\Seen')
+                    _unread_cache["ts"] = None
+                    return dict(cached)
+            
+            status, msg_data = mail.uid('FETCH', email_id, '(RFC822)')
+            
+            # An unknown UID is an OK response with no message data
+            if status != 'OK' or not msg_data or not isinstance(msg_data[0], tuple):
+                return None
+            
+            # Mark as read
+            mail.uid('STORE', email_id, '+FLAGS', '\\Seen')
+            _unread_cache["ts"] = None
         
         raw_email = msg_data[0][1]
-        msg = email.message_from_bytes(raw_email)
+        msg = email.message_from_bytes(raw_email, policy=policy.default)
         
         # Parse date
-        date_str = msg.get('Date', '')
+        date_str = str(msg.get('Date', ''))
         try:
             date_obj = parsedate_to_datetime(date_str)
             date_formatted = date_obj.strftime('%Y-%m-%d %H:%M')
         except:
             date_formatted = date_str
         
-        from_addr = parse_email_address(decode_email_header(msg.get('From', '')))
-        to_addr = parse_email_address(decode_email_header(msg.get('To', '')))
+        from_addr = _header_address(msg['From'])
+        to_addr = _header_address(msg['To'])
         
         email_data = {
             "id": email_id,
-            "subject": decode_email_header(msg.get('Subject', '(No Subject)')),
+            "subject": str(msg.get('Subject', '(No Subject)')),
             "from": from_addr,
             "to": to_addr,
             "date": date_formatted,
             "body": get_email_body(msg),
-            "message_id": msg.get('Message-ID', ''),
+            "message_id": str(msg.get('Message-ID', '')),
             "folder": folder
         }
         
-        mail.logout()
-        return email_data
+        if email_data["message_id"]:
+            _email_cache_put(cache_key, email_data)
+        return dict(email_data)
         
     except Exception as e:
         logger.error(f"Error fetching email {email_id}: {e}")
         return None
 
 
+_SUPPORT_HTML_TEMPLATE = string.Template("""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="white-space: pre-wrap;">$body</div>
+            <br>
+            <hr style="border: none; border-top: 1px solid #ddd; margin: 20px 0;">
+            <p style="color: #888; font-size: 12px;">
+                MedMCQ Support<br>
+                <a href="mailto:support@medmcq.com.au">support@medmcq.com.au</a>
+            </p>
+        </body>
+        </html>
+        """)
+
+
 def send_email_from_support(
     to_email: str,
     subject: str,
@@ -302,20 +536,8 @@ def send_email_from_support(
             message["In-Reply-To"] = reply_to_message_id
             message["References"] = reply_to_message_id
         
-        # Create HTML version of the body
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="white-space: pre-wrap;">{body}</div>
-            <br>
-            <hr style="border: none; border-top: 1px solid #ddd; margin: 20px 0;">
-            <p style="color: #888; font-size: 12px;">
-                MedMCQ Support<br>
-                <a href="mailto:support@medmcq.com.au">support@medmcq.com.au</a>
-            </p>
-        </body>
-        </html>
-        """
+        # Create HTML version of the body (escaped, since it is free text)
+        html_body = _SUPPORT_HTML_TEMPLATE.substitute(body=html.escape(body))
         
         # Attach both plain text and HTML versions
         part1 = MIMEText(body, "plain")
@@ -323,13 +545,9 @@ def send_email_from_support(
         message.attach(part1)
         message.attach(part2)
         
-        # Send via SMTP
-        context = ssl.create_default_context()
-        
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls(context=context)
-            server.login(SUPPORT_EMAIL, SUPPORT_PASSWORD)
-            server.sendmail(SUPPORT_EMAIL, to_email, message.as_string())
+        # Send over a pooled, already authenticated support session
+        with smtp_pool.get(SUPPORT_EMAIL, SUPPORT_PASSWORD) as server:
+            server.send_message(message, from_addr=SUPPORT_EMAIL, to_addrs=[to_email])
         
         logger.info(f"Email sent from support to {to_email}")
         return True
@@ -346,25 +564,27 @@ def send_email_from_support(
 
 
 def get_unread_count() -> int:
-    """Get count of unread emails in inbox"""
+    """Get count of unread emails in inbox (cached for UNREAD_COUNT_TTL seconds)"""
     if not SUPPORT_PASSWORD:
         return 0
     
+    cached_at = _unread_cache["ts"]
+    if cached_at is not None and time.monotonic() - cached_at < UNREAD_COUNT_TTL:
+        return _unread_cache["count"]
+    
     try:
-        context = ssl.create_default_context()
-        mail = imaplib.IMAP4_SSL(IMAP_HOST, IMAP_PORT, ssl_context=context)
-        mail.login(SUPPORT_EMAIL, SUPPORT_PASSWORD)
-        mail.select("INBOX")
-        
-        status, messages = mail.search(None, 'UNSEEN')
+        with _imap_pool.get() as mail:
+            mail.select("INBOX", readonly=True)
+            status, messages = mail.search(None, 'UNSEEN')
         
         if status == 'OK':
             unread_ids = messages[0].split()
             count = len(unread_ids)
+            _unread_cache["count"] = count
+            _unread_cache["ts"] = time.monotonic()
         else:
             count = 0
         
-        mail.logout()
         return count
         
     except Exception as e:
@@ -9,8 +9,15 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
 from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 
 # Load environment variables
 load_dotenv(Path(__file__).parent / '.env')
@@ -38,6 +45,177 @@ SMTP_REPLY_TO = os.environ.get('SMTP_REPLY_TO', SUPPORT_EMAIL)
 
 APP_URL = os.environ.get('APP_URL', 'http://localhost:3000')
 
+# Templates are compiled once and kept for the life of the process
+_template_env = Environment(
+    loader=FileSystemLoader(str(Path(__file__).parent / 'email_templates')),
+    autoescape=select_autoescape(['html']),
+    auto_reload=False,
+    cache_size=-1
+)
+
+
+def render_email_template(name: str, **context) -> tuple:
+    """Render email_templates/<name>.html and <name>.txt, returning (html, plain)"""
+    html_content = _template_env.get_template(f"{name}.html").render(**context)
+    plain_content = _template_env.get_template(f"{name}.txt").render(**context)
+    return html_content, plain_content
+
+
+# Built once and shared with email_client_service: loading the CA bundle is the
+# expensive part of a TLS context
+SSL_CONTEXT = ssl.create_default_context()
+
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', '8'))  # per sending account
+SMTP_POOL_IDLE_TIMEOUT = int(os.environ.get('SMTP_POOL_IDLE_TIMEOUT', '100'))  # seconds
+
+
+class SMTPConnectionPool:
+    """Pool of logged-in SMTP sessions, kept separately for each sending account
+    
+    Reusing a session skips the connect + STARTTLS + AUTH exchange on every email.
+    Sessions idle longer than idle_timeout are closed, others are checked with NOOP.
+    """
+    
+    def __init__(self, max_conns: int = SMTP_POOL_SIZE, idle_timeout: int = SMTP_POOL_IDLE_TIMEOUT):
+        self._max_conns = max_conns
+        self._idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle = {}  # username -> LifoQueue of (server, last_used)
+        self._slots = {}  # username -> BoundedSemaphore
+    
+    def _account(self, username: str):
+        with self._lock:
+            if username not in self._idle:
+                self._idle[username] = queue.LifoQueue(maxsize=self._max_conns)
+                self._slots[username] = threading.BoundedSemaphore(self._max_conns)
+            return self._idle[username], self._slots[username]
+    
+    @staticmethod
+    def _connect(username: str, password: str) -> smtplib.SMTP:
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+        try:
+            server.starttls(context=SSL_CONTEXT)
+            server.login(username, password)
+        except BaseException:
+            server.close()
+            raise
+        return server
+    
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+    
+    def _checkout(self, idle: queue.LifoQueue, username: str, password: str) -> smtplib.SMTP:
+        while True:
+            try:
+                server, last_used = idle.get_nowait()
+            except queue.Empty:
+                return self._connect(username, password)
+            
+            if time.monotonic() - last_used <= self._idle_timeout:
+                try:
+                    if server.noop()[0] == 250:
+                        return server
+                except (smtplib.SMTPException, OSError):
+                    pass
+            self._close(server)
+    
+    @contextmanager
+    def get(self, username: str, password: str):
+        """Borrow a session for username; broken sessions are dropped, not returned"""
+        idle, slots = self._account(username)
+        slots.acquire()
+        try:
+            server = self._checkout(idle, username, password)
+        except BaseException:
+            slots.release()
+            raise
+        
+        healthy = True
+        try:
+            yield server
+        except (smtplib.SMTPServerDisconnected, OSError):
+            healthy = False
+            raise
+        except smtplib.SMTPException:
+            # The session may be mid-transaction; reset it before reuse
+            try:
+                server.rset()
+            except (smtplib.SMTPException, OSError):
+                healthy = False
+            raise
+        finally:
+            try:
+                if healthy:
+                    try:
+                        idle.put_nowait((server, time.monotonic()))
+                    except queue.Full:
+                        self._close(server)
+                else:
+                    self._close(server)
+            finally:
+                slots.release()
+
+
+smtp_pool = SMTPConnectionPool()
+
+EMAIL_WORKERS = int(os.environ.get('EMAIL_WORKERS', '4'))
+_email_executor = None
+_email_executor_lock = threading.Lock()
+
+
+def _get_email_executor() -> ThreadPoolExecutor:
+    global _email_executor
+    if _email_executor is None:
+        with _email_executor_lock:
+            if _email_executor is None:
+                _email_executor = ThreadPoolExecutor(max_workers=EMAIL_WORKERS, thread_name_prefix="email")
+    return _email_executor
+
+
+def _log_background_result(name: str, future: Future):
+    try:
+        sent = future.result()
+    except Exception as e:
+        logger.error(f"Background email {name} raised: {e}")
+        return
+    if not sent:
+        logger.warning(f"Background email {name} was not sent")
+
+
+def send_in_background(send_func, *args, **kwargs) -> Future:
+    """
+    Run one of the send_* helpers on the email worker pool and return immediately
+    
+    Failures are logged by the worker; the returned Future resolves to the helper's bool.
+    """
+    future = _get_email_executor().submit(send_func, *args, **kwargs)
+    future.add_done_callback(partial(_log_background_result, send_func.__name__))
+    return future
+
+
+def _build_message(subject, html_content, plain_content, from_email, from_name, to_header, reply_to):
+    """Assemble the multipart/alternative message sent by send_email"""
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = f"{from_name} <{from_email}>"
+    message["To"] = to_header
+    if reply_to:
+        message["Reply-To"] = reply_to
+
+    # Add plain text version (required for better deliverability)
+    if plain_content:
+        part1 = MIMEText(plain_content, "plain")
+        message.attach(part1)
+
+    # Add HTML version
+    part2 = MIMEText(html_content, "html")
+    message.attach(part2)
+    return message
+
 
 def send_email(
     to_email: str,
@@ -79,30 +257,11 @@ def send_email(
         return False
 
     try:
-        # Create message
-        message = MIMEMultipart("alternative")
-        message["Subject"] = subject
-        message["From"] = f"{from_name} <{from_email}>"
-        message["To"] = to_email
-        if reply_to:
-            message["Reply-To"] = reply_to
-
-        # Add plain text version (required for better deliverability)
-        if plain_content:
-            part1 = MIMEText(plain_content, "plain")
-            message.attach(part1)
-
-        # Add HTML version
-        part2 = MIMEText(html_content, "html")
-        message.attach(part2)
-
-        # Create secure connection and send
-        context = ssl.create_default_context()
+        message = _build_message(subject, html_content, plain_content, from_email, from_name, to_email, reply_to)
 
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls(context=context)
-            server.login(username, password)
-            server.sendmail(from_email, to_email, message.as_string())
+        # Send over a pooled, already authenticated connection
+        with smtp_pool.get(username, password) as server:
+            server.send_message(message, from_addr=from_email, to_addrs=[to_email])
 
         logger.info(f"Email sent successfully to {to_email} from {from_email}")
         return True
@@ -127,64 +286,11 @@ def send_verification_email(to_email: str, user_name: str, verification_token: s
 
     subject = "Verify Your MedMCQ Account"
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-        <div style="background: linear-gradient(135deg, #2563eb, #7c3aed); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-            <h1 style="color: white; margin: 0; font-size: 28px;">Welcome to MedMCQ!</h1>
-        </div>
-        
-        <div style="background: #f9fafb; padding: 30px; border: 1px solid #e5e7eb; border-top: none; border-radius: 0 0 12px 12px;">
-            <p style="font-size: 16px;">Hi {user_name},</p>
-            
-            <p style="font-size: 16px;">Thank you for signing up for MedMCQ! Please verify your email address by clicking the button below:</p>
-            
-            <div style="text-align: center; margin: 30px 0;">
-                <a href="{verification_link}" style="background: linear-gradient(135deg, #2563eb, #7c3aed); color: white; padding: 14px 32px; text-decoration: none; border-radius: 8px; font-weight: bold; font-size: 16px; display: inline-block;">
-                    Verify Email Address
-                </a>
-            </div>
-            
-            <p style="font-size: 14px; color: #6b7280;">If the button doesn't work, copy and paste this link into your browser:</p>
-            <p style="font-size: 12px; color: #9ca3af; word-break: break-all;">{verification_link}</p>
-            
-            <hr style="border: none; border-top: 1px solid #e5e7eb; margin: 30px 0;">
-            
-            <p style="font-size: 14px; color: #6b7280;">This link will expire in 24 hours. If you didn't create an account, you can safely ignore this email.</p>
-            
-            <p style="font-size: 14px; color: #6b7280;">
-                Best regards,<br>
-                The MedMCQ Team
-            </p>
-        </div>
-        
-        <div style="text-align: center; padding: 20px; color: #9ca3af; font-size: 12px;">
-            <p>MedMCQ - Medical Student Learning Platform</p>
-            <p>For educational purposes only. Not for actual medical diagnosis.</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    plain_content = f"""
-    Welcome to MedMCQ!
-    
-    Hi {user_name},
-    
-    Thank you for signing up for MedMCQ! Please verify your email address by clicking the link below:
-    
-    {verification_link}
-    
-    This link will expire in 24 hours. If you didn't create an account, you can safely ignore this email.
-
-    Best regards,
-    The MedMCQ Team
-    """
+    html_content, plain_content = render_email_template(
+        "verification",
+        user_name=user_name,
+        verification_link=verification_link
+    )
 
     return send_email(
         to_email=to_email,
@@ -208,68 +314,11 @@ def send_password_reset_email(to_email: str, user_name: str, reset_token: str) -
 
     subject = "Reset Your MedMCQ Password"
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-        <div style="background: linear-gradient(135deg, #2563eb, #7c3aed); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-            <h1 style="color: white; margin: 0; font-size: 28px;">Password Reset Request</h1>
-        </div>
-        
-        <div style="background: #f9fafb; padding: 30px; border: 1px solid #e5e7eb; border-top: none; border-radius: 0 0 12px 12px;">
-            <p style="font-size: 16px;">Hi {user_name},</p>
-            
-            <p style="font-size: 16px;">We received a request to reset your MedMCQ password. Click the button below to create a new password:</p>
-            
-            <div style="text-align: center; margin: 30px 0;">
-                <a href="{reset_link}" style="background: linear-gradient(135deg, #2563eb, #7c3aed); color: white; padding: 14px 32px; text-decoration: none; border-radius: 8px; font-weight: bold; font-size: 16px; display: inline-block;">
-                    Reset Password
-                </a>
-            </div>
-            
-            <p style="font-size: 14px; color: #6b7280;">If the button doesn't work, copy and paste this link into your browser:</p>
-            <p style="font-size: 12px; color: #9ca3af; word-break: break-all;">{reset_link}</p>
-            
-            <hr style="border: none; border-top: 1px solid #e5e7eb; margin: 30px 0;">
-            
-            <p style="font-size: 14px; color: #6b7280;"><strong>This link will expire in 1 hour.</strong></p>
-            
-            <p style="font-size: 14px; color: #6b7280;">If you didn't request a password reset, please ignore this email or contact support if you have concerns.</p>
-            
-            <p style="font-size: 14px; color: #6b7280;">
-                Best regards,<br>
-                The MedMCQ Team
-            </p>
-        </div>
-        
-        <div style="text-align: center; padding: 20px; color: #9ca3af; font-size: 12px;">
-            <p>MedMCQ - Medical Student Learning Platform</p>
-            <p>For educational purposes only. Not for actual medical diagnosis.</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    plain_content = f"""
-    Password Reset Request
-    
-    Hi {user_name},
-    
-    We received a request to reset your MedMCQ password. Click the link below to create a new password:
-    
-    {reset_link}
-    
-    This link will expire in 1 hour.
-    
-    If you didn't request a password reset, please ignore this email or contact support if you have concerns.
-
-    Best regards,
-    The MedMCQ Team
-    """
+    html_content, plain_content = render_email_template(
+        "reset",
+        user_name=user_name,
+        reset_link=reset_link
+    )
 
     return send_email(
         to_email=to_email,
@@ -290,76 +339,13 @@ def send_qualifying_session_email(to_email: str, user_name: str, sessions_comple
     """
     subject = f"Congratulations! Qualifying Session {sessions_completed}/3 Complete"
     
-    unlock_message = ""
-    if sessions_completed >= 3:
-        unlock_message = """
-            <div style="background: #10b981; color: white; padding: 20px; border-radius: 8px; margin: 20px 0; text-align: center;">
-                <h2 style="margin: 0 0 10px 0;">🎉 FULL QUESTION BANK UNLOCKED!</h2>
-                <p style="margin: 0;">You now have access to all 60,000+ questions!</p>
-            </div>
-        """
-    else:
-        remaining = 3 - sessions_completed
-        unlock_message = f"""
-            <p style="font-size: 16px; color: #6b7280;">Only <strong>{remaining} more qualifying session(s)</strong> to unlock the full question bank!</p>
-        """
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-        <div style="background: linear-gradient(135deg, #10b981, #059669); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-            <h1 style="color: white; margin: 0; font-size: 28px;">🏆 Qualifying Session Complete!</h1>
-        </div>
-        
-        <div style="background: #f9fafb; padding: 30px; border: 1px solid #e5e7eb; border-top: none; border-radius: 0 0 12px 12px;">
-            <p style="font-size: 16px;">Hi {user_name},</p>
-            
-            <p style="font-size: 16px;">Congratulations! You've completed a qualifying session with a score of <strong>{score:.0f}%</strong>!</p>
-            
-            <div style="background: #eff6ff; padding: 20px; border-radius: 8px; margin: 20px 0; text-align: center;">
-                <h2 style="color: #2563eb; margin: 0;">Sessions Completed: {sessions_completed}/3</h2>
-            </div>
-            
-            {unlock_message}
-            
-            <div style="text-align: center; margin: 30px 0;">
-                <a href="{APP_URL}/questions" style="background: linear-gradient(135deg, #2563eb, #7c3aed); color: white; padding: 14px 32px; text-decoration: none; border-radius: 8px; font-weight: bold; font-size: 16px; display: inline-block;">
-                    Continue Studying
-                </a>
-            </div>
-            
-            <p style="font-size: 14px; color: #6b7280;">
-                Keep up the great work!<br>
-                The MedMCQ Team
-            </p>
-        </div>
-        
-        <div style="text-align: center; padding: 20px; color: #9ca3af; font-size: 12px;">
-            <p>MedMCQ - Medical Student Learning Platform</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    plain_content = f"""
-    Qualifying Session Complete!
-    
-    Hi {user_name},
-    
-    Congratulations! You've completed a qualifying session with a score of {score:.0f}%!
-    
-    Sessions Completed: {sessions_completed}/3
-    
-    {"🎉 FULL QUESTION BANK UNLOCKED! You now have access to all 60,000+ questions!" if sessions_completed >= 3 else f"Only {3 - sessions_completed} more qualifying session(s) to unlock the full question bank!"}
-    
-    Keep up the great work!
-    The MedMCQ Team
-    """
+    html_content, plain_content = render_email_template(
+        "qualifying",
+        user_name=user_name,
+        sessions_completed=sessions_completed,
+        score=score,
+        app_url=APP_URL
+    )
 
     return send_email(
         to_email=to_email,
@@ -393,64 +379,19 @@ def send_email_from_support(to_email: str, subject: str, message_body: str, user
         message["To"] = to_email
         message["Reply-To"] = support_email
         
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        </head>
-        <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-            <div style="background: linear-gradient(135deg, #2563eb, #7c3aed); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-                <h1 style="color: white; margin: 0; font-size: 28px;">Message from MedMCQ</h1>
-            </div>
-            
-            <div style="background: #f9fafb; padding: 30px; border: 1px solid #e5e7eb; border-top: none; border-radius: 0 0 12px 12px;">
-                <p style="font-size: 16px;">Hi {user_name},</p>
-                
-                <div style="font-size: 16px; white-space: pre-wrap;">{message_body}</div>
-                
-                <hr style="border: none; border-top: 1px solid #e5e7eb; margin: 30px 0;">
-                
-                <p style="font-size: 14px; color: #6b7280;">
-                    Best regards,<br>
-                    The MedMCQ Support Team
-                </p>
-                
-                <p style="font-size: 12px; color: #9ca3af;">
-                    You can reply directly to this email if you have any questions.
-                </p>
-            </div>
-            
-            <div style="text-align: center; padding: 20px; color: #9ca3af; font-size: 12px;">
-                <p>MedMCQ - Medical Student Learning Platform</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        plain_content = f"""
-        Hi {user_name},
-        
-        {message_body}
-        
-        Best regards,
-        The MedMCQ Support Team
-        
-        You can reply directly to this email if you have any questions.
-        """
+        html_content, plain_content = render_email_template(
+            "support",
+            user_name=user_name,
+            message_body=message_body
+        )
         
         part1 = MIMEText(plain_content, "plain")
         message.attach(part1)
         part2 = MIMEText(html_content, "html")
         message.attach(part2)
         
-        context = ssl.create_default_context()
-
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls(context=context)
-            server.login(support_email, support_password)
-            server.sendmail(support_email, to_email, message.as_string())
+        with smtp_pool.get(support_email, support_password) as server:
+            server.send_message(message, from_addr=support_email, to_addrs=[to_email])
 
         logger.info(f"Support email sent successfully to {to_email}")
         return True
@@ -475,67 +416,15 @@ def send_question_report_notification(
 
     subject = f"Question Reported: {question_id}"
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-        <div style="background: linear-gradient(135deg, #dc2626, #b91c1c); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-            <h1 style="color: white; margin: 0; font-size: 28px;">⚠️ Question Reported</h1>
-        </div>
-        
-        <div style="background: #f9fafb; padding: 30px; border: 1px solid #e5e7eb; border-top: none; border-radius: 0 0 12px 12px;">
-            <h3 style="color: #374151; margin-top: 0;">Report Details:</h3>
-            
-            <table style="width: 100%; border-collapse: collapse; margin: 20px 0;">
-                <tr>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb; font-weight: bold; width: 120px;">Question ID:</td>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb;">{question_id}</td>
-                </tr>
-                <tr>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb; font-weight: bold;">Reported By:</td>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb;">{reporter_name} ({reporter_email})</td>
-                </tr>
-                <tr>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb; font-weight: bold;">Reason:</td>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb;">{report_reason}</td>
-                </tr>
-            </table>
-            
-            <div style="background: #fef3c7; padding: 15px; border-radius: 8px; margin: 20px 0;">
-                <strong>Question Text:</strong>
-                <p style="margin: 10px 0 0 0;">{question_text[:500]}{'...' if len(question_text) > 500 else ''}</p>
-            </div>
-            
-            <div style="text-align: center; margin: 30px 0;">
-                <a href="{APP_URL}/admin/reported-issues" style="background: linear-gradient(135deg, #2563eb, #7c3aed); color: white; padding: 14px 32px; text-decoration: none; border-radius: 8px; font-weight: bold; font-size: 16px; display: inline-block;">
-                    Review in Admin Panel
-                </a>
-            </div>
-        </div>
-        
-        <div style="text-align: center; padding: 20px; color: #9ca3af; font-size: 12px;">
-            <p>MedMCQ Admin Notification</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    plain_content = f"""
-    Question Reported
-    
-    Question ID: {question_id}
-    Reported By: {reporter_name} ({reporter_email})
-    Reason: {report_reason}
-    
-    Question Text:
-    {question_text[:500]}{'...' if len(question_text) > 500 else ''}
-
-    Review this report in the admin panel.
-    """
+    html_content, plain_content = render_email_template(
+        "report",
+        question_id=question_id,
+        question_text=question_text,
+        report_reason=report_reason,
+        reporter_email=reporter_email,
+        reporter_name=reporter_name,
+        app_url=APP_URL
+    )
 
     return send_email(
         to_email=support_email,
@@ -564,63 +453,13 @@ def send_contact_form_notification(
 
     email_subject = f"Contact Form: {subject}"
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px;">
-        <div style="background: linear-gradient(135deg, #2563eb, #7c3aed); padding: 30px; border-radius: 12px 12px 0 0; text-align: center;">
-            <h1 style="color: white; margin: 0; font-size: 28px;">📩 New Contact Form Submission</h1>
-        </div>
-        
-        <div style="background: #f9fafb; padding: 30px; border: 1px solid #e5e7eb; border-top: none; border-radius: 0 0 12px 12px;">
-            <table style="width: 100%; border-collapse: collapse; margin: 20px 0;">
-                <tr>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb; font-weight: bold; width: 100px;">From:</td>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb;">{sender_name}</td>
-                </tr>
-                <tr>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb; font-weight: bold;">Email:</td>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb;"><a href="mailto:{sender_email}">{sender_email}</a></td>
-                </tr>
-                <tr>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb; font-weight: bold;">Subject:</td>
-                    <td style="padding: 10px; border-bottom: 1px solid #e5e7eb;">{subject}</td>
-                </tr>
-            </table>
-            
-            <div style="background: white; padding: 20px; border-radius: 8px; border: 1px solid #e5e7eb; margin: 20px 0;">
-                <strong>Message:</strong>
-                <p style="margin: 10px 0 0 0; white-space: pre-wrap;">{message}</p>
-            </div>
-            
-            <div style="text-align: center; margin: 30px 0;">
-                <a href="mailto:{sender_email}?subject=Re: {subject}" style="background: linear-gradient(135deg, #2563eb, #7c3aed); color: white; padding: 14px 32px; text-decoration: none; border-radius: 8px; font-weight: bold; font-size: 16px; display: inline-block;">
-                    Reply to {sender_name}
-                </a>
-            </div>
-        </div>
-        
-        <div style="text-align: center; padding: 20px; color: #9ca3af; font-size: 12px;">
-            <p>MedMCQ Contact Form Notification</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    plain_content = f"""
-    New Contact Form Submission
-    
-    From: {sender_name}
-    Email: {sender_email}
-    Subject: {subject}
-    
-    Message:
-    {message}
-    """
+    html_content, plain_content = render_email_template(
+        "contact",
+        sender_name=sender_name,
+        sender_email=sender_email,
+        subject=subject,
+        message=message
+    )
 
     return send_email(
         to_email=support_email,
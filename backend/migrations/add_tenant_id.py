@@ -46,8 +46,8 @@ DEFAULT_TENANT = {
     "footer_company": "ABUNDITA INVESTMENTS PTY LTD",
     "footer_abn": "55 100 379 299",
     "footer_address": "2/24 Edgar St, Coffs Harbour NSW 2450, Australia",
-    "is_active": True,
-    "created_at": datetime.utcnow().isoformat()
+    "is_active": True
+    # created_at is stamped at insert time in run_migration
 }
 
 # Collections that need tenant_id
@@ -65,6 +65,23 @@ COLLECTIONS_TO_UPDATE = [
     "password_resets"
 ]
 
+# Indexes for tenant queries: (collection, keys, create_index options)
+TENANT_INDEXES = [
+    ("tenants", "domain", {"unique": True}),
+    ("tenants", "tenant_id", {"unique": True}),
+    # Users - lookup by email within tenant
+    ("users", [("tenant_id", 1), ("email", 1)], {"unique": True}),
+    # Questions - filter by tenant and category / source
+    ("questions", [("tenant_id", 1), ("category", 1)], {}),
+    ("questions", [("tenant_id", 1), ("source", 1)], {}),
+    # User progress - lookup by user and tenant
+    ("user_progress", [("tenant_id", 1), ("user_id", 1)], {}),
+    # Study sessions - lookup by user, tenant, date
+    ("study_sessions", [("tenant_id", 1), ("user_id", 1), ("date", 1)], {}),
+    # Exam sessions - lookup by tenant and user
+    ("exam_sessions", [("tenant_id", 1), ("user_id", 1)], {}),
+]
+
 
 async def run_migration():
     """Run the tenant_id migration."""
@@ -86,24 +103,22 @@ async def run_migration():
         if existing_tenant:
             logger.info("Default tenant 'med' already exists")
         else:
-            await db.tenants.insert_one(DEFAULT_TENANT)
+            # ISO string, matching TenantConfig.created_at
+            await db.tenants.insert_one({**DEFAULT_TENANT, "created_at": datetime.utcnow().isoformat()})
             logger.info("Created default tenant 'med'")
         
-        # Step 2: Add tenant_id to all collections
-        for collection_name in COLLECTIONS_TO_UPDATE:
-            logger.info(f"\nStep 2.{COLLECTIONS_TO_UPDATE.index(collection_name) + 1}: Processing collection '{collection_name}'...")
-            
-            collection = db[collection_name]
-            
-            # Count documents without tenant_id
-            count_without = await collection.count_documents({"tenant_id": {"$exists": False}})
-            
-            if count_without > 0:
-                # Update documents without tenant_id
-                result = await collection.update_many(
-                    {"tenant_id": {"$exists": False}},
-                    {"$set": {"tenant_id": "med"}}
-                )
+        # Step 2: Add tenant_id to all collections (independent, so run concurrently)
+        logger.info(f"\nStep 2: Adding tenant_id to {len(COLLECTIONS_TO_UPDATE)} collections...")
+        results = await asyncio.gather(*[
+            db[collection_name].update_many(
+                {"tenant_id": {"$exists": False}},
+                {"$set": {"tenant_id": "med"}}
+            )
+            for collection_name in COLLECTIONS_TO_UPDATE
+        ])
+        
+        for collection_name, result in zip(COLLECTIONS_TO_UPDATE, results):
+            if result.modified_count > 0:
                 logger.info(f"  Updated {result.modified_count} documents in '{collection_name}'")
                 total_updated += result.modified_count
             else:
@@ -112,49 +127,17 @@ async def run_migration():
         # Step 3: Create indexes for tenant queries
         logger.info("\nStep 3: Creating indexes for tenant queries...")
         
-        try:
-            # Tenants collection indexes
-            await db.tenants.create_index("domain", unique=True)
-            await db.tenants.create_index("tenant_id", unique=True)
-            logger.info("  Created indexes on tenants collection")
-        except Exception as e:
-            logger.warning(f"  Index may already exist on tenants: {e}")
-        
-        try:
-            # Users - lookup by email within tenant
-            await db.users.create_index([("tenant_id", 1), ("email", 1)])
-            logger.info("  Created compound index on users (tenant_id, email)")
-        except Exception as e:
-            logger.warning(f"  Index may already exist on users: {e}")
+        # Builds are independent, so start them together and let failures report individually
+        results = await asyncio.gather(*[
+            db[collection_name].create_index(keys, background=True, **options)
+            for collection_name, keys, options in TENANT_INDEXES
+        ], return_exceptions=True)
         
-        try:
-            # Questions - filter by tenant and category
-            await db.questions.create_index([("tenant_id", 1), ("category", 1)])
-            await db.questions.create_index([("tenant_id", 1), ("source", 1)])
-            logger.info("  Created indexes on questions collection")
-        except Exception as e:
-            logger.warning(f"  Indexes may already exist on questions: {e}")
-        
-        try:
-            # User progress - lookup by user and tenant
-            await db.user_progress.create_index([("tenant_id", 1), ("user_id", 1)])
-            logger.info("  Created index on user_progress collection")
-        except Exception as e:
-            logger.warning(f"  Index may already exist on user_progress: {e}")
-        
-        try:
-            # Study sessions - lookup by user, tenant, date
-            await db.study_sessions.create_index([("tenant_id", 1), ("user_id", 1), ("date", 1)])
-            logger.info("  Created index on study_sessions collection")
-        except Exception as e:
-            logger.warning(f"  Index may already exist on study_sessions: {e}")
-        
-        try:
-            # Exam sessions - lookup by tenant and user
-            await db.exam_sessions.create_index([("tenant_id", 1), ("user_id", 1)])
-            logger.info("  Created index on exam_sessions collection")
-        except Exception as e:
-            logger.warning(f"  Index may already exist on exam_sessions: {e}")
+        for (collection_name, keys, _), result in zip(TENANT_INDEXES, results):
+            if isinstance(result, Exception):
+                logger.warning(f"  Index may already exist on {collection_name} {keys}: {result}")
+            else:
+                logger.info(f"  Created index {result} on {collection_name}")
         
         logger.info(f"\n{'='*50}")
         logger.info(f"Migration completed successfully!")
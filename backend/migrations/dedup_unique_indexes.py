@@ -0,0 +1,168 @@
+"""Data Migration Script: Remove Duplicates and Build the Unique Indexes
+
+Startup requires some indexes to be unique, but older releases created them
+without the constraint (or not at all) and wrote those collections with racy
+check-then-insert code, so live databases can hold duplicates that make the
+unique index build fail. This script removes the duplicates and then builds
+the indexes as unique, replacing any existing non-unique index on the same keys.
+
+Run it after migrations.add_tenant_id, since that fills in the tenant_id the
+users index is keyed on.
+
+Usage:
+    python -m migrations.dedup_unique_indexes
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+# (collection, unique key fields, sort putting the document to keep first in each group)
+UNIQUE_INDEXES = [
+    # Users - the first account registered for an email within a tenant is kept
+    ("users", ["tenant_id", "email"], {"created_at": 1, "_id": 1}),
+    # User progress - the record with the most answers is kept
+    ("user_progress", ["user_id"], {"total_questions_answered": -1, "_id": 1}),
+]
+
+
+async def find_duplicates(collection, fields: list, sort: dict) -> list:
+    """Group documents by the key fields; returns the _ids of each duplicated group, keeper first."""
+    pipeline = [
+        {"$sort": sort},
+        {"$group": {
+            "_id": {field: f"${field}" for field in fields},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    return await collection.aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+
+async def remove_duplicates(collection, fields: list, sort: dict) -> int:
+    """Delete all but the first document of every duplicated group."""
+    groups = await find_duplicates(collection, fields, sort)
+    removed = 0
+    for group in groups:
+        extra_ids = group["ids"][1:]
+        logger.info(f"  {collection.name} {group['_id']}: keeping {group['ids'][0]}, removing {extra_ids}")
+        result = await collection.delete_many({"_id": {"$in": extra_ids}})
+        removed += result.deleted_count
+    return removed
+
+
+async def merge_daily_usage(collection) -> int:
+    """Fold duplicate per-day counters into one document, summing questions_viewed."""
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "date": "$date"},
+            "ids": {"$push": "$_id"},
+            "questions_viewed": {"$sum": "$questions_viewed"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    groups = await collection.aggregate(pipeline, allowDiskUse=True).to_list(None)
+    removed = 0
+    for group in groups:
+        keep_id, extra_ids = group["ids"][0], group["ids"][1:]
+        logger.info(f"  {collection.name} {group['_id']}: merging {len(group['ids'])} counters into {keep_id}")
+        await collection.update_one(
+            {"_id": keep_id},
+            {"$set": {"questions_viewed": group["questions_viewed"]}}
+        )
+        result = await collection.delete_many({"_id": {"$in": extra_ids}})
+        removed += result.deleted_count
+    return removed
+
+
+async def ensure_unique_index(collection, fields: list) -> str:
+    """Build a unique index on the fields, dropping a non-unique one with the same keys first."""
+    keys = [(field, 1) for field in fields]
+    indexes = await collection.index_information()
+    for name, info in indexes.items():
+        if info["key"] == keys and not info.get("unique"):
+            logger.info(f"  Dropping non-unique index {name} on {collection.name}")
+            await collection.drop_index(name)
+    return await collection.create_index(keys, unique=True)
+
+
+async def run_migration():
+    """Run the duplicate removal and unique index migration."""
+    # Connect to MongoDB
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    db_name = os.environ.get('DB_NAME', 'test_database')
+    
+    logger.info(f"Connecting to MongoDB: {mongo_url}")
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+    
+    total_removed = 0
+    
+    try:
+        for collection_name, fields, sort in UNIQUE_INDEXES:
+            collection = db[collection_name]
+            logger.info(f"\nDeduplicating '{collection_name}' on {fields}...")
+            removed = await remove_duplicates(collection, fields, sort)
+            total_removed += removed
+            logger.info(f"  Removed {removed} duplicate documents from '{collection_name}'")
+            
+            index_name = await ensure_unique_index(collection, fields)
+            logger.info(f"  Ensured unique index {index_name} on '{collection_name}'")
+        
+        # Daily usage - duplicate counters for a day are merged rather than dropped,
+        # so the usage already recorded still counts against the limit
+        logger.info("\nMerging duplicate 'daily_usage' counters on ['user_id', 'date']...")
+        removed = await merge_daily_usage(db.daily_usage)
+        total_removed += removed
+        logger.info(f"  Removed {removed} duplicate documents from 'daily_usage'")
+        
+        index_name = await ensure_unique_index(db.daily_usage, ["user_id", "date"])
+        logger.info(f"  Ensured unique index {index_name} on 'daily_usage'")
+        
+        logger.info(f"\n{'='*50}")
+        logger.info(f"Migration completed successfully!")
+        logger.info(f"Total duplicates removed: {total_removed}")
+        logger.info(f"{'='*50}")
+        
+        return {
+            "success": True,
+            "total_removed": total_removed,
+            "message": f"Migration completed. Removed {total_removed} duplicate documents."
+        }
+    
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        return {
+            "success": False,
+            "error": str(e),
+            "message": f"Migration failed: {e}"
+        }
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    result = asyncio.run(run_migration())
+    print(f"\nResult: {result}")
@@ -1,9 +1,34 @@
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
+from pydantic import BaseModel, Field, EmailStr, ConfigDict, model_validator
 from typing import List, Optional, Dict, Any
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
+import os
+import threading
 import uuid
 
+class _UUIDPool:
+    """Random UUID4 strings cut from a shared os.urandom buffer (one syscall per 256 ids)"""
+    
+    def __init__(self, size: int = 4096):
+        self._size = size
+        self._buf = b""
+        self._off = size
+        self._lock = threading.Lock()
+    
+    def new(self) -> str:
+        with self._lock:
+            if self._off + 16 > self._size:
+                self._buf = os.urandom(self._size)
+                self._off = 0
+            b = bytearray(self._buf[self._off:self._off + 16])
+            self._off += 16
+        b[6] = (b[6] & 0x0F) | 0x40  # version 4
+        b[8] = (b[8] & 0x3F) | 0x80  # RFC 4122 variant
+        return str(uuid.UUID(bytes=bytes(b)))
+
+_uuid_pool = _UUIDPool()
+
 class DifficultyLevel(str, Enum):
     EASY = "1"
     MEDIUM = "2"
@@ -71,9 +96,9 @@ class UserLogin(BaseModel):
     password: str
 
 class User(UserBase):
-    model_config = ConfigDict(extra="ignore")
+    model_config = ConfigDict(frozen=True, extra="ignore")
     
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=_uuid_pool.new)
     # Multi-tenant identifier
     tenant_id: str = "med"
     institution: Optional[str] = None
@@ -83,7 +108,7 @@ class User(UserBase):
     subscription_tier: SubscriptionTier = SubscriptionTier.FREE
     subscription_status: Optional[str] = "free"
     subscription_plan: Optional[str] = None
-    subscription_end: Optional[str] = None
+    subscription_end: Optional[datetime] = None
     storage_used_gb: float = 0.0
     storage_quota_gb: float = 5.0
     ai_daily_uses: int = 0
@@ -121,7 +146,7 @@ class QuestionCreate(QuestionBase):
 class Question(QuestionBase):
     model_config = ConfigDict(extra="ignore")
     
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=_uuid_pool.new)
     # Multi-tenant identifier
     tenant_id: str = "med"
     user_id: Optional[str] = None  # None means global question
@@ -130,6 +155,32 @@ class Question(QuestionBase):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     verified: bool = False
 
+class GeneratedQuestion(Question):
+    """AI-generated question with the rule-based quality checks applied on construction
+    
+    Rules:
+    1. Question must be at least 50 characters
+    2. Must have 4-5 options
+    3. Correct answer index must be valid
+    4. Explanation must be at least 50 characters
+    5. No duplicate options
+    6. Options must not be empty
+    """
+    question: str = Field(min_length=50)
+    options: List[str] = Field(min_length=4, max_length=5)
+    explanation: str = Field(min_length=50)
+    
+    @model_validator(mode="after")
+    def check_options(self):
+        option_count = len(self.options)
+        if not 0 <= self.correct_answer < option_count:
+            raise ValueError("correct_answer is not a valid option index")
+        if any(not opt.strip() for opt in self.options):
+            raise ValueError("options must not be empty")
+        if len(set(self.options)) != option_count:
+            raise ValueError("options must be unique")
+        return self
+
 # User Progress Models
 class UserAnswer(BaseModel):
     question_id: str
@@ -138,24 +189,29 @@ class UserAnswer(BaseModel):
     time_taken: int  # seconds
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
-class CategoryProgress(BaseModel):
+# Internal containers built server-side are slotted dataclasses rather than BaseModels;
+# Pydantic still validates them when they are nested in a model (e.g. UserProgress)
+@dataclass(slots=True)
+class CategoryProgress:
     category: QuestionCategory
     current_difficulty: DifficultyLevel = DifficultyLevel.EASY
     correct_streak: int = 0
     wrong_streak: int = 0
     total_answered: int = 0
     total_correct: int = 0
-    last_updated: datetime = Field(default_factory=datetime.utcnow)
+    last_updated: datetime = field(default_factory=datetime.utcnow)
 
 class UserProgress(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=_uuid_pool.new)
     # Multi-tenant identifier
     tenant_id: str = "med"
     user_id: str
     category_progress: Dict[str, CategoryProgress] = {}
-    subcategory_tracking: Optional[Dict[str, Any]] = {}  # For 3/4 complexity progression tracking
+    # For 3/4 complexity progression tracking: "category:subcategory:level" -> packed int
+    # (see AdaptiveLearningEngine.WINDOW_MASK); older documents may hold dict records
+    subcategory_tracking: Optional[Dict[str, Any]] = Field(default_factory=dict)
     total_questions_answered: int = 0
     total_correct: int = 0
     highest_streak: int = 0
@@ -167,10 +223,9 @@ class UserProgress(BaseModel):
     full_bank_unlocked: bool = False  # True after 3 qualifying sessions
 
 # Study Session Models
-class StudySession(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+@dataclass(slots=True, kw_only=True)
+class StudySession:
+    id: str = field(default_factory=_uuid_pool.new)
     # Multi-tenant identifier
     tenant_id: str = "med"
     user_id: str
@@ -178,7 +233,7 @@ class StudySession(BaseModel):
     questions_answered: int = 0
     correct_answers: int = 0
     time_spent: int = 0  # seconds
-    categories_studied: List[str] = []
+    categories_studied: List[str] = field(default_factory=list)
 
 # AI Generation Models
 class AIGenerationRequest(BaseModel):
@@ -190,6 +245,7 @@ class AIGenerationRequest(BaseModel):
 
 class AIGenerationResponse(BaseModel):
     questions: List[Question]
+    requested_count: int  # May exceed len(questions) when invalid or duplicate ones were dropped
     usage_count: int
     remaining_daily_uses: int
 
@@ -210,9 +266,9 @@ class UserAnalytics(BaseModel):
 
 # Exam Models
 class ExamSession(BaseModel):
-    model_config = ConfigDict(extra="ignore")
+    model_config = ConfigDict(frozen=True, extra="ignore")
     
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=_uuid_pool.new)
     # Multi-tenant identifier
     tenant_id: str = "med"
     user_id: str
@@ -222,11 +278,16 @@ class ExamSession(BaseModel):
     started_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
     score: Optional[int] = None
-    # Track original answer mappings for randomized options
-    answer_mappings: Dict[str, List[int]] = {}  # question_id -> list of original indices in display order
+    # Track original answer mappings for randomized options, packed in question_ids order:
+    # per question a count byte followed by the original option indices in display order
+    answer_mappings: bytes = b""
     question_count: int = 0  # Total questions in session
     is_qualifying_session: bool = False  # Whether this session counted toward unlock
 
+class ExamSessionResponse(ExamSession):
+    """ExamSession as returned to clients, with answer_mappings unpacked"""
+    answer_mappings: Dict[str, List[int]] = {}  # question_id -> list of original indices in display order
+
 class ExamResult(BaseModel):
     score: int
     correct: int
@@ -238,7 +299,7 @@ class ExamResult(BaseModel):
 class QuestionReport(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=_uuid_pool.new)
     # Multi-tenant identifier
     tenant_id: str = "med"
     question_id: str
@@ -249,16 +310,15 @@ class QuestionReport(BaseModel):
     resolved: bool = False
 
 # Storage Models
-class StorageFile(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+@dataclass(slots=True, kw_only=True)
+class StorageFile:
+    id: str = field(default_factory=_uuid_pool.new)
     user_id: str
     filename: str
     file_type: str
     size_bytes: int
     storage_path: str
-    uploaded_at: datetime = Field(default_factory=datetime.utcnow)
+    uploaded_at: datetime = field(default_factory=datetime.utcnow)
 
 class DataExportRequest(BaseModel):
     include_questions: bool = True
@@ -1,18 +1,26 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import asyncio
 import os
 import logging
+import secrets
+import time
 import uuid
 from pathlib import Path
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import io
 import zipfile
 import json
-import pandas as pd
+import orjson
+import numpy as np
+from cachetools import TTLCache
 
 # Import models
 from models import (
@@ -20,14 +28,14 @@ from models import (
     Question, QuestionCreate, QuestionCategory, DifficultyLevel,
     UserProgress, UserAnswer, CategoryProgress, StudySession,
     AIGenerationRequest, AIGenerationResponse,
-    ExamSession, ExamResult, QuestionReport,
+    ExamSession, ExamSessionResponse, ExamResult, QuestionReport,
     UserAnalytics, DataExportRequest
 )
 
 # Import services
 from auth_service import (
-    hash_password, verify_password, create_access_token,
-    create_refresh_token, get_current_user
+    hash_password_async, verify_and_update_password_async, verify_dummy_password_async,
+    create_access_token, create_refresh_token, get_current_user
 )
 from storage_service import storage_service
 from ai_service import ai_service
@@ -35,6 +43,7 @@ from adaptive_learning import adaptive_engine
 
 # Import email service
 from email_service import (
+    send_in_background,
     send_verification_email,
     send_password_reset_email,
     send_qualifying_session_email,
@@ -59,17 +68,29 @@ from tenant_config import (
     clear_tenant_cache
 )
 from tenant_middleware import get_current_tenant, get_tenant_config
+from config import (
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_COMPRESSORS
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    retryWrites=True,
+    compressors=MONGO_COMPRESSORS
+)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app
-app = FastAPI(title="MedMCQ API", version="1.0.0")
+app = FastAPI(title="MedMCQ API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Store db in app state for middleware access
 app.state.db = db
@@ -79,17 +100,62 @@ api_router = APIRouter(prefix="/api")
 
 # Configure logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
 # Root-level health check for deployment (MUST be before api_router)
+# Probes hit /health every second per pod, so the body is rendered at most once a second
+_health_body = {"second": None, "content": b""}
+
 @app.get("/health")
 async def root_health_check():
     """Root-level health check endpoint for Kubernetes deployment."""
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
-
+    now = int(time.time())
+    if now != _health_body["second"]:
+        _health_body["content"] = orjson.dumps({
+            "status": "healthy",
+            # Naive UTC, as before (an aware datetime would add "+00:00")
+            "timestamp": datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None).isoformat()
+        })
+        _health_body["second"] = now
+    return Response(content=_health_body["content"], media_type="application/json")
+
+
+# (collection, keys, create_index options) ensured on startup
+STARTUP_INDEXES = [
+    # Tenants
+    ("tenants", "domain", {"unique": True}),
+    ("tenants", "tenant_id", {"unique": True}),
+    # Users - lookup by email within tenant (or across tenants), by pending verification token
+    ("users", [("tenant_id", 1), ("email", 1)], {"unique": True}),
+    ("users", "email", {}),
+    ("users", "verification_token", {
+        "partialFilterExpression": {"verification_token": {"$exists": True}}
+    }),
+    # Questions - filter by tenant and category, lookups by id, and the get_questions
+    # filter shape (equality fields first, then the year/difficulty ranges); the last
+    # also serves tenant + source filters
+    ("questions", [("tenant_id", 1), ("category", 1)], {}),
+    ("questions", [("tenant_id", 1), ("source", 1), ("category", 1), ("year", 1), ("difficulty", 1)], {}),
+    ("questions", "id", {}),
+    # Question reports - lookup by question, and unresolved count per tenant
+    ("question_reports", [("question_id", 1), ("tenant_id", 1), ("resolved", 1)], {}),
+    # User progress - lookup by user and tenant, and by user alone
+    ("user_progress", [("tenant_id", 1), ("user_id", 1)], {}),
+    ("user_progress", "user_id", {"unique": True}),
+    # Password resets - lookup by token; expired tokens are removed by the TTL monitor
+    ("password_resets", "token", {"unique": True}),
+    ("password_resets", "expires_at", {"expireAfterSeconds": 0}),
+    # Daily usage - one counter per user and day (upserted by consume_daily_question)
+    ("daily_usage", [("user_id", 1), ("date", 1)], {"unique": True}),
+    # Study sessions - lookup by user, tenant, date, and by user and date alone
+    ("study_sessions", [("tenant_id", 1), ("user_id", 1), ("date", 1)], {}),
+    ("study_sessions", [("user_id", 1), ("date", 1)], {}),
+    # Exam sessions - lookup by tenant and user
+    ("exam_sessions", [("tenant_id", 1), ("user_id", 1)], {}),
+]
 
 # Startup event for tenant initialization and index creation
 @app.on_event("startup")
@@ -100,50 +166,29 @@ async def startup_event():
     # Ensure default tenant exists
     await ensure_default_tenant(db)
     
-    # Create indexes for tenant queries
-    try:
-        # Tenants collection indexes
-        await db.tenants.create_index("domain", unique=True)
-        await db.tenants.create_index("tenant_id", unique=True)
-        logger.info("Created indexes on tenants collection")
-    except Exception as e:
-        logger.warning(f"Tenant indexes may already exist: {e}")
-    
-    try:
-        # Users - lookup by email within tenant
-        await db.users.create_index([("tenant_id", 1), ("email", 1)])
-        logger.info("Created compound index on users (tenant_id, email)")
-    except Exception as e:
-        logger.warning(f"User index may already exist: {e}")
-    
-    try:
-        # Questions - filter by tenant and category
-        await db.questions.create_index([("tenant_id", 1), ("category", 1)])
-        await db.questions.create_index([("tenant_id", 1), ("source", 1)])
-        logger.info("Created indexes on questions collection")
-    except Exception as e:
-        logger.warning(f"Question indexes may already exist: {e}")
-    
-    try:
-        # User progress - lookup by user and tenant
-        await db.user_progress.create_index([("tenant_id", 1), ("user_id", 1)])
-        logger.info("Created index on user_progress collection")
-    except Exception as e:
-        logger.warning(f"User progress index may already exist: {e}")
-    
-    try:
-        # Study sessions - lookup by user, tenant, date
-        await db.study_sessions.create_index([("tenant_id", 1), ("user_id", 1), ("date", 1)])
-        logger.info("Created index on study_sessions collection")
-    except Exception as e:
-        logger.warning(f"Study sessions index may already exist: {e}")
+    # Create indexes concurrently; create_index is a no-op when a matching index exists
+    results = await asyncio.gather(*[
+        db[collection_name].create_index(keys, **options)
+        for collection_name, keys, options in STARTUP_INDEXES
+    ], return_exceptions=True)
+    
+    missing_unique = []
+    for (collection_name, keys, options), result in zip(STARTUP_INDEXES, results):
+        if isinstance(result, Exception):
+            if options.get("unique"):
+                # Correctness (registration, progress upserts, daily limits) relies on these
+                logger.error(f"Could not create unique index {keys} on {collection_name}: {result}")
+                missing_unique.append(f"{collection_name} {keys}")
+            else:
+                logger.warning(f"Could not create index {keys} on {collection_name}: {result}")
+        else:
+            logger.info(f"Ensured index {result} on {collection_name}")
     
-    try:
-        # Exam sessions - lookup by tenant and user
-        await db.exam_sessions.create_index([("tenant_id", 1), ("user_id", 1)])
-        logger.info("Created index on exam_sessions collection")
-    except Exception as e:
-        logger.warning(f"Exam sessions index may already exist: {e}")
+    if missing_unique:
+        raise RuntimeError(
+            f"Missing unique indexes: {', '.join(missing_unique)}. "
+            "Run python -m migrations.dedup_unique_indexes and restart."
+        )
     
     logger.info("Multi-tenant system initialization complete")
 
@@ -305,22 +350,31 @@ async def admin_get_reported_issues(user_id: str = Depends(get_current_user)):
     # Get all reports with question details
     reports = await db.question_reports.find({}, {"_id": 0}).sort("timestamp", -1).to_list(500)
     
-    # Enrich with question data
+    # Enrich with question and reporter data: two $in lookups instead of two per report
+    question_ids = list({r.get("question_id") for r in reports})
+    reporter_ids = list({r.get("user_id") for r in reports})
+    questions, users = await asyncio.gather(
+        db.questions.find(
+            {"id": {"$in": question_ids}},
+            {"_id": 0, "id": 1, "question": 1, "category": 1, "quarantined": 1}
+        ).to_list(None),
+        db.users.find(
+            {"id": {"$in": reporter_ids}},
+            {"_id": 0, "id": 1, "email": 1, "full_name": 1}
+        ).to_list(None)
+    )
+    questions_by_id = {q["id"]: q for q in questions}
+    users_by_id = {u["id"]: u for u in users}
+    
     for report in reports:
-        question = await db.questions.find_one(
-            {"id": report.get("question_id")}, 
-            {"_id": 0, "question": 1, "category": 1, "quarantined": 1}
-        )
+        question = questions_by_id.get(report.get("question_id"))
         if question:
             report["question_text"] = question.get("question", "N/A")
             report["question_category"] = question.get("category", "N/A")
             report["question_quarantined"] = question.get("quarantined", False)
         
         # Get reporter info
-        user = await db.users.find_one(
-            {"id": report.get("user_id")},
-            {"_id": 0, "email": 1, "full_name": 1}
-        )
+        user = users_by_id.get(report.get("user_id"))
         if user:
             report["reporter_email"] = user.get("email", "Unknown")
             report["reporter_name"] = user.get("full_name", "Unknown")
@@ -328,6 +382,9 @@ async def admin_get_reported_issues(user_id: str = Depends(get_current_user)):
     return reports
 
 
+REPORT_STATUSES = frozenset({"pending", "fixed", "quarantined"})
+RESOLVED_REPORT_STATUSES = frozenset({"fixed", "quarantined"})
+
 @api_router.put("/admin/reported-issues/{question_id}/status")
 async def admin_update_report_status(
     question_id: str,
@@ -342,26 +399,23 @@ async def admin_update_report_status(
         raise HTTPException(status_code=403, detail="Admin access required")
     
     new_status = data.get("status")
-    if new_status not in ["pending", "fixed", "quarantined"]:
+    if not isinstance(new_status, str) or new_status not in REPORT_STATUSES:
         raise HTTPException(status_code=400, detail="Invalid status. Use: pending, fixed, quarantined")
     
     # Update all reports for this question
-    await db.question_reports.update_many(
+    writes = [db.question_reports.update_many(
         {"question_id": question_id},
-        {"$set": {"status": new_status, "resolved": new_status in ["fixed", "quarantined"]}}
-    )
+        {"$set": {"status": new_status, "resolved": new_status in RESOLVED_REPORT_STATUSES}}
+    )]
     
-    # Update question quarantine status
-    if new_status == "quarantined":
-        await db.questions.update_one(
-            {"id": question_id},
-            {"$set": {"quarantined": True}}
-        )
-    elif new_status == "fixed":
-        await db.questions.update_one(
+    # Update question quarantine status (pending leaves the question untouched)
+    if new_status in RESOLVED_REPORT_STATUSES:
+        writes.append(db.questions.update_one(
             {"id": question_id},
-            {"$set": {"quarantined": False}}
-        )
+            {"$set": {"quarantined": new_status == "quarantined"}}
+        ))
+    
+    await asyncio.gather(*writes)
     
     logger.info(f"Admin {user_id} updated question {question_id} status to {new_status}")
     return {"success": True, "message": f"Question status updated to {new_status}"}
@@ -377,12 +431,20 @@ async def admin_get_users_for_email(user_id: str = Depends(get_current_user)):
     if not await verify_admin(user_id):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    users = await db.users.find(
+    cursor = db.users.find(
         {},
         {"_id": 0, "id": 1, "email": 1, "full_name": 1, "subscription_plan": 1, "created_at": 1}
-    ).sort("created_at", -1).to_list(1000)
+    ).sort("created_at", -1).limit(1000)
+    
+    # Stream the JSON array row by row instead of materialising the whole list
+    async def generate():
+        separator = b"["
+        async for user in cursor:
+            yield separator + orjson.dumps(user)
+            separator = b","
+        yield b"]" if separator == b"," else b"[]"
     
-    return users
+    return StreamingResponse(generate(), media_type="application/json")
 
 
 # ============================================================================
@@ -398,7 +460,7 @@ async def admin_get_inbox(
     if not await verify_admin(user_id):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    emails = fetch_emails(folder="INBOX", limit=limit)
+    emails = await run_in_threadpool(fetch_emails, folder="INBOX", limit=limit)
     return {"emails": emails, "folder": "inbox", "count": len(emails)}
 
 
@@ -411,7 +473,7 @@ async def admin_get_sent(
     if not await verify_admin(user_id):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    emails = fetch_emails(folder="Sent", limit=limit)
+    emails = await run_in_threadpool(fetch_emails, folder="Sent", limit=limit)
     return {"emails": emails, "folder": "sent", "count": len(emails)}
 
 
@@ -421,7 +483,7 @@ async def admin_get_unread_count(user_id: str = Depends(get_current_user)):
     if not await verify_admin(user_id):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    count = get_unread_count()
+    count = await run_in_threadpool(get_unread_count)
     return {"unread_count": count}
 
 
@@ -435,7 +497,7 @@ async def admin_get_email_message(
     if not await verify_admin(user_id):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    email_data = fetch_email_by_id(email_id, folder)
+    email_data = await run_in_threadpool(fetch_email_by_id, email_id, folder)
     
     if not email_data:
         raise HTTPException(status_code=404, detail="Email not found")
@@ -460,7 +522,8 @@ async def admin_send_email(
     if not to_email or not subject or not body:
         raise HTTPException(status_code=400, detail="to, subject, and body are required")
     
-    success = send_support_email(
+    success = await run_in_threadpool(
+        send_support_email,
         to_email=to_email,
         subject=subject,
         body=body,
@@ -474,7 +537,7 @@ async def admin_send_email(
             "to_email": to_email,
             "subject": subject,
             "body": body,
-            "sent_at": datetime.utcnow().isoformat(),
+            "sent_at": datetime.utcnow(),
             "success": True
         })
         return {"success": True, "message": "Email sent successfully"}
@@ -499,7 +562,7 @@ async def admin_reply_to_email(
         raise HTTPException(status_code=400, detail="original_email_id and body are required")
     
     # Fetch original email to get details
-    original = fetch_email_by_id(original_email_id, folder)
+    original = await run_in_threadpool(fetch_email_by_id, original_email_id, folder)
     
     if not original:
         raise HTTPException(status_code=404, detail="Original email not found")
@@ -513,7 +576,8 @@ async def admin_reply_to_email(
     # Add quoted original message
     reply_body = f"{body}\n\n---\nOn {original['date']}, {original['from']['name']} <{original['from']['email']}> wrote:\n\n{original['body']}"
     
-    success = send_support_email(
+    success = await run_in_threadpool(
+        send_support_email,
         to_email=to_email,
         subject=subject,
         body=reply_body,
@@ -527,7 +591,7 @@ async def admin_reply_to_email(
             "subject": subject,
             "body": reply_body,
             "reply_to": original_email_id,
-            "sent_at": datetime.utcnow().isoformat(),
+            "sent_at": datetime.utcnow(),
             "success": True
         })
         return {"success": True, "message": "Reply sent successfully"}
@@ -544,52 +608,67 @@ async def admin_multi_tenant_dashboard(user_id: str = Depends(get_current_user))
     # Get all tenants
     tenants = await get_all_tenants(db, include_inactive=True)
     
-    # Aggregate stats per tenant
+    # One grouped aggregation per collection, run concurrently, instead of 4 counts per tenant
+    thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).date().isoformat()
+    user_rows, question_rows, session_rows = await asyncio.gather(
+        db.users.aggregate([
+            {"$group": {
+                "_id": "$tenant_id",
+                "users": {"$sum": 1},
+                # Active subscriptions (non-free)
+                "active_subscriptions": {"$sum": {"$cond": [
+                    {"$and": [
+                        {"$in": ["$subscription_status", ["active", "free_grant"]]},
+                        {"$ne": ["$subscription_plan", "free"]}
+                    ]},
+                    1, 0
+                ]}}
+            }}
+        ]).to_list(None),
+        db.questions.aggregate([
+            {"$group": {"_id": "$tenant_id", "questions": {"$sum": 1}}}
+        ]).to_list(None),
+        # Study sessions in last 30 days
+        db.study_sessions.aggregate([
+            {"$match": {"date": {"$gte": thirty_days_ago}}},
+            {"$group": {"_id": "$tenant_id", "sessions": {"$sum": 1}}}
+        ]).to_list(None)
+    )
+    users_by_tenant = {row["_id"]: row for row in user_rows}
+    questions_by_tenant = {row["_id"]: row["questions"] for row in question_rows}
+    sessions_by_tenant = {row["_id"]: row["sessions"] for row in session_rows}
+    
+    # Stats per tenant, accumulating the overall totals in the same pass
     tenant_stats = []
+    active_tenants = total_users = total_questions = total_subscriptions = 0
     for tenant in tenants:
         tid = tenant.tenant_id
-        
-        # Count users for this tenant
-        user_count = await db.users.count_documents({"tenant_id": tid})
-        
-        # Count questions for this tenant
-        question_count = await db.questions.count_documents({"tenant_id": tid})
-        
-        # Count active subscriptions (non-free)
-        active_subs = await db.users.count_documents({
-            "tenant_id": tid,
-            "subscription_status": {"$in": ["active", "free_grant"]},
-            "subscription_plan": {"$ne": "free"}
-        })
-        
-        # Count study sessions in last 30 days
-        thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).date().isoformat()
-        recent_sessions = await db.study_sessions.count_documents({
-            "tenant_id": tid,
-            "date": {"$gte": thirty_days_ago}
-        })
+        user_row = users_by_tenant.get(tid, {})
+        users = user_row.get("users", 0)
+        questions = questions_by_tenant.get(tid, 0)
+        active_subscriptions = user_row.get("active_subscriptions", 0)
         
         tenant_stats.append({
             "tenant_id": tid,
             "name": tenant.name,
             "domain": tenant.domain,
             "is_active": tenant.is_active,
-            "users": user_count,
-            "questions": question_count,
-            "active_subscriptions": active_subs,
-            "recent_sessions_30d": recent_sessions
+            "users": users,
+            "questions": questions,
+            "active_subscriptions": active_subscriptions,
+            "recent_sessions_30d": sessions_by_tenant.get(tid, 0)
         })
-    
-    # Overall totals
-    total_users = sum(t["users"] for t in tenant_stats)
-    total_questions = sum(t["questions"] for t in tenant_stats)
-    total_subscriptions = sum(t["active_subscriptions"] for t in tenant_stats)
+        
+        active_tenants += tenant.is_active
+        total_users += users
+        total_questions += questions
+        total_subscriptions += active_subscriptions
     
     return {
         "tenants": tenant_stats,
         "totals": {
             "total_tenants": len(tenants),
-            "active_tenants": len([t for t in tenants if t.is_active]),
+            "active_tenants": active_tenants,
             "total_users": total_users,
             "total_questions": total_questions,
             "total_active_subscriptions": total_subscriptions
@@ -600,6 +679,34 @@ async def admin_multi_tenant_dashboard(user_id: str = Depends(get_current_user))
 # AUTHENTICATION ROUTES (Tenant-Aware)
 # ============================================================================
 
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-flight
+_background_tasks = set()
+
+def track_background_task(coro):
+    """Run a coroutine as a task that outlives the request."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+async def auto_verify_if_unsent(user_id: str, email: str, email_future) -> None:
+    """Auto-verify a new user whose verification email could not be sent."""
+    try:
+        email_sent = await asyncio.wrap_future(email_future)
+    except Exception:
+        email_sent = False
+    
+    if not email_sent:
+        logger.warning(f"Failed to send verification email to {email}, auto-verifying")
+        await db.users.update_one(
+            {"id": user_id},
+            {"$set": {"email_verified": True}}
+        )
+
+async def find_tenant_user(email: str, tenant_id: str, projection: dict) -> Optional[dict]:
+    """Look up a user by email within a tenant, fetching only the given fields."""
+    return await db.users.find_one({"email": email, "tenant_id": tenant_id}, projection)
+
 @api_router.post("/auth/register", response_model=User)
 async def register(
     user_data: UserCreate,
@@ -611,11 +718,7 @@ async def register(
     Users are registered to the tenant determined by the request domain.
     """
     # Check if user exists within this tenant
-    existing_user = await db.users.find_one({
-        "email": user_data.email,
-        "tenant_id": tenant_id
-    })
-    if existing_user:
+    if await find_tenant_user(user_data.email, tenant_id, {"_id": 1}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -629,7 +732,9 @@ async def register(
         )
     
     # Generate email verification token
-    verification_token = str(uuid.uuid4())
+    verification_token = secrets.token_urlsafe(32)
+    
+    hashed_password = await hash_password_async(user_data.password)
     
     # Create user with tenant_id
     user = User(
@@ -645,46 +750,45 @@ async def register(
         tenant_id=tenant_id  # Multi-tenant: assign to current tenant
     )
     
-    # Hash password and store separately
-    hashed_password = hash_password(user_data.password)
-    
     # Store user in database
     user_dict = user.model_dump()
     user_dict['hashed_password'] = hashed_password
-    user_dict['created_at'] = user_dict['created_at'].isoformat()
     
-    await db.users.insert_one(user_dict)
+    # The unique (tenant_id, email) index settles a registration race lost while hashing
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     # Initialize user progress with tenant_id
     progress = UserProgress(user_id=user.id, tenant_id=tenant_id)
     progress_dict = progress.model_dump()
-    progress_dict['last_activity'] = progress_dict['last_activity'].isoformat()
-    await db.user_progress.insert_one(progress_dict)
     
-    # Log initial subscription history (starting as free)
-    await db.subscription_history.insert_one({
-        "user_id": user.id,
-        "tenant_id": tenant_id,
-        "action": "registration",
-        "from_plan": None,
-        "to_plan": "free",
-        "timestamp": datetime.utcnow().isoformat()
-    })
+    # Progress and the initial subscription history (starting as free) are independent writes
+    await asyncio.gather(
+        db.user_progress.insert_one(progress_dict),
+        db.subscription_history.insert_one({
+            "user_id": user.id,
+            "tenant_id": tenant_id,
+            "action": "registration",
+            "from_plan": None,
+            "to_plan": "free",
+            "timestamp": datetime.utcnow()
+        })
+    )
     
-    # Send verification email
-    email_sent = send_verification_email(
+    # Send the verification email on the email workers without holding the response;
+    # if it fails, the user is auto-verified once the send has finished
+    email_future = send_in_background(
+        send_verification_email,
         to_email=user.email,
         user_name=user.full_name,
         verification_token=verification_token
     )
-    
-    if not email_sent:
-        logger.warning(f"Failed to send verification email to {user.email}, auto-verifying")
-        # Fallback: auto-verify if email fails
-        await db.users.update_one(
-            {"id": user.id},
-            {"$set": {"email_verified": True}}
-        )
+    track_background_task(auto_verify_if_unsent(user.id, user.email, email_future))
     
     logger.info(f"New user registered: {user.email} for tenant: {tenant_id}")
     return user
@@ -700,15 +804,16 @@ async def login(
     Users can only login on the tenant they registered with.
     """
     # Find user within this tenant
-    user = await db.users.find_one({
-        "email": credentials.email,
-        "tenant_id": tenant_id
-    })
+    user = await find_tenant_user(credentials.email, tenant_id, {"_id": 0, "id": 1, "hashed_password": 1})
     
     if not user:
-        # Also check if user exists in another tenant (for better error message)
-        other_tenant_user = await db.users.find_one({"email": credentials.email})
-        if other_tenant_user:
+        # Also check if user exists in another tenant (for better error message), while
+        # burning a password check so a miss takes as long as a wrong password
+        in_other_tenant, _ = await asyncio.gather(
+            db.users.count_documents({"email": credentials.email}, limit=1),
+            verify_dummy_password_async(credentials.password)
+        )
+        if in_other_tenant:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Account not found on this platform. Please login on the correct platform."
@@ -719,12 +824,20 @@ async def login(
         )
     
     # Verify password
-    if not verify_password(credentials.password, user['hashed_password']):
+    password_valid, new_hash = await verify_and_update_password_async(credentials.password, user['hashed_password'])
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
+    # Upgrade legacy bcrypt hashes to argon2id
+    if new_hash:
+        await db.users.update_one(
+            {"id": user['id']},
+            {"$set": {"hashed_password": new_hash}}
+        )
+    
     # Create tokens
     access_token = create_access_token(user['id'])
     refresh_token = create_refresh_token(user['id'])
@@ -741,17 +854,12 @@ async def forgot_password(
     tenant_id: str = Depends(get_current_tenant)
 ):
     """Request password reset with tenant awareness."""
-    import secrets
-    
     email = data.get('email')
     if not email:
         raise HTTPException(status_code=400, detail="Email is required")
     
     # Find user within this tenant (don't reveal if email exists for security)
-    user = await db.users.find_one({
-        "email": email,
-        "tenant_id": tenant_id
-    })
+    user = await find_tenant_user(email, tenant_id, {"_id": 1, "full_name": 1})
     
     if user:
         # Generate reset token
@@ -764,21 +872,18 @@ async def forgot_password(
             "email": email,
             "tenant_id": tenant_id,
             "token": reset_token,
-            "expires_at": expires_at.isoformat(),
-            "created_at": datetime.utcnow().isoformat()
+            "expires_at": expires_at,  # native date so the TTL index can expire it
+            "created_at": datetime.utcnow()
         })
         
         # Send password reset email
-        email_sent = send_password_reset_email(
+        send_in_background(
+            send_password_reset_email,
             to_email=email,
             user_name=user.get('full_name', 'User'),
             reset_token=reset_token
         )
-        
-        if email_sent:
-            logger.info(f"Password reset email sent to {email} (tenant: {tenant_id})")
-        else:
-            logger.warning(f"Failed to send password reset email to {email}")
+        logger.info(f"Password reset email queued for {email} (tenant: {tenant_id})")
     
     # Always return success (don't reveal if email exists)
     return {"message": "If an account exists with this email, you will receive password reset instructions shortly."}
@@ -795,20 +900,18 @@ async def reset_password(data: dict):
     if len(new_password) < 6:
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
     
-    # Find reset token
-    reset_record = await db.password_resets.find_one({"token": token})
+    # Find an unexpired reset token; the TTL index reaps expired ones within a minute,
+    # the expires_at filter covers that gap
+    reset_record = await db.password_resets.find_one(
+        {"token": token, "expires_at": {"$gt": datetime.utcnow()}},
+        {"_id": 0, "email": 1}
+    )
     
     if not reset_record:
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
     
-    # Check if expired
-    expires_at = datetime.fromisoformat(reset_record['expires_at'])
-    if datetime.utcnow() > expires_at:
-        await db.password_resets.delete_one({"token": token})
-        raise HTTPException(status_code=400, detail="Reset token has expired")
-    
     # Update password
-    hashed_password = hash_password(new_password)
+    hashed_password = await hash_password_async(new_password)
     await db.users.update_one(
         {"email": reset_record['email']},
         {"$set": {"hashed_password": hashed_password}}
@@ -858,10 +961,7 @@ async def resend_verification_email(
         raise HTTPException(status_code=400, detail="Email is required")
     
     # Find user
-    user = await db.users.find_one({
-        "email": email,
-        "tenant_id": tenant_id
-    })
+    user = await find_tenant_user(email, tenant_id, {"_id": 1, "full_name": 1, "email_verified": 1})
     
     if not user:
         # Don't reveal if email exists
@@ -871,23 +971,20 @@ async def resend_verification_email(
         return {"message": "Email is already verified. You can login now."}
     
     # Generate new verification token
-    new_token = str(uuid.uuid4())
+    new_token = secrets.token_urlsafe(32)
     await db.users.update_one(
         {"email": email, "tenant_id": tenant_id},
         {"$set": {"verification_token": new_token}}
     )
     
     # Send verification email
-    email_sent = send_verification_email(
+    send_in_background(
+        send_verification_email,
         to_email=email,
         user_name=user.get('full_name', 'User'),
         verification_token=new_token
     )
-    
-    if email_sent:
-        logger.info(f"Verification email resent to {email}")
-    else:
-        logger.warning(f"Failed to resend verification email to {email}")
+    logger.info(f"Verification email resend queued for {email}")
     
     return {"message": "If an account exists with this email, a verification link will be sent."}
 
@@ -913,35 +1010,100 @@ async def get_current_user_info(user_id: str = Depends(get_current_user)):
 
 import random
 
-def randomize_answer_options(question_dict):
+def randomize_answer_options(question_dicts):
     """
-    Randomize the order of answer options and return the new correct answer index.
-    Returns: (randomized_options, new_correct_index, original_to_new_mapping)
+    Randomize the order of answer options for a batch of questions.
+    Returns one (randomized_options, new_correct_index, original_indices) per question,
+    where original_indices lists each displayed option's original position.
     """
-    options = question_dict.get('options', [])
-    correct_answer = question_dict.get('correct_answer', 0)
-    
-    # Create list of (original_index, option_text)
-    indexed_options = list(enumerate(options))
-    
-    # Shuffle the options
-    random.shuffle(indexed_options)
-    
-    # Extract the new order
-    new_options = [opt for _, opt in indexed_options]
-    original_indices = [idx for idx, _ in indexed_options]
-    
-    # Find new correct answer index
-    new_correct_index = original_indices.index(correct_answer)
+    if not question_dicts:
+        return []
     
-    return new_options, new_correct_index, original_indices
+    options_list = [q.get('options', []) for q in question_dicts]
+    counts = np.array([len(options) for options in options_list])
+    # Imported rows can hold the index as a float; normalise to int as list.index did
+    if any(q.get('correct_answer') is None for q in question_dicts):
+        raise ValueError("correct_answer is missing")
+    correct_answers = np.array([int(q['correct_answer']) for q in question_dicts])
+    if np.any((correct_answers < 0) | (correct_answers >= counts)):
+        raise ValueError("correct_answer is not a valid option index")
+    
+    # One argsort over random keys shuffles every row at once; padding columns
+    # (questions with fewer options) get keys above 1 so they sort to the end
+    rows = np.arange(len(question_dicts))
+    width = int(counts.max())
+    keys = np.random.random((len(question_dicts), width))
+    keys[np.arange(width) >= counts[:, None]] = 2.0
+    permutations = np.argsort(keys, axis=1)
+    
+    # Inverse permutation gives each original index's new position
+    positions = np.empty_like(permutations)
+    positions[rows[:, None], permutations] = np.arange(width)
+    new_correct = positions[rows, correct_answers]
+    
+    results = []
+    for options, count, permutation, correct in zip(
+        options_list, counts.tolist(), permutations.tolist(), new_correct.tolist()
+    ):
+        original_indices = permutation[:count]
+        results.append(([options[i] for i in original_indices], correct, original_indices))
+    return results
+
+def pack_answer_mappings(permutations) -> bytes:
+    """Pack per-question option permutations into ExamSession.answer_mappings bytes."""
+    buf = bytearray()
+    for original_indices in permutations:
+        buf.append(len(original_indices))
+        buf.extend(original_indices)
+    return bytes(buf)
+
+def unpack_answer_mappings(question_ids, packed) -> dict:
+    """Return question_id -> original indices from a stored exam's answer_mappings."""
+    if isinstance(packed, dict):
+        # Sessions created before mappings were packed
+        return packed
+    
+    mappings = {}
+    offset = 0
+    for question_id in question_ids:
+        if offset >= len(packed):
+            break
+        count = packed[offset]
+        mappings[question_id] = list(packed[offset + 1:offset + 1 + count])
+        offset += 1 + count
+    return mappings
+
+# Per-user lookups on the question-serving path. They change rarely: writes made through
+# this process evict the entry, other workers see changes within the TTL
+USER_LOOKUP_CACHE_TTL_SECONDS = 60
+_unlock_status_cache = TTLCache(maxsize=10_000, ttl=USER_LOOKUP_CACHE_TTL_SECONDS)
+_study_year_cache = TTLCache(maxsize=10_000, ttl=USER_LOOKUP_CACHE_TTL_SECONDS)
 
 async def get_user_unlock_status(user_id: str):
     """Check if user has unlocked the full question bank."""
-    progress = await db.user_progress.find_one({"user_id": user_id}, {"_id": 0})
+    cached = _unlock_status_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
+    progress = await db.user_progress.find_one(
+        {"user_id": user_id},
+        {"_id": 0, "full_bank_unlocked": 1, "qualifying_sessions_completed": 1}
+    )
     if not progress:
-        return False, 0
-    return progress.get('full_bank_unlocked', False), progress.get('qualifying_sessions_completed', 0)
+        unlock_status = (False, 0)
+    else:
+        unlock_status = (progress.get('full_bank_unlocked', False), progress.get('qualifying_sessions_completed', 0))
+    _unlock_status_cache[user_id] = unlock_status
+    return unlock_status
+
+def question_tenant_filter(tenant_id: str) -> dict:
+    """Questions visible to a tenant: its own plus global ones.
+    
+    Global questions have tenant_id null or no tenant_id at all (legacy); an equality
+    match on null covers both, so one $in keeps the filter on a single index range
+    instead of a three-way $or.
+    """
+    return {'tenant_id': {'$in': [tenant_id, None]}}
 
 # Daily question limits by subscription tier
 DAILY_LIMITS_BY_TIER = {
@@ -951,11 +1113,12 @@ DAILY_LIMITS_BY_TIER = {
     'quarterly': -1,  # Unlimited
     'annual': -1,     # Unlimited
 }
+SUBSCRIBED_STATUSES = frozenset({'active', 'free_grant'})
 
-async def check_daily_question_limit(user_id: str) -> tuple:
+def get_daily_limit(user: dict) -> tuple:
     """
-    Check if user has exceeded their daily question limit based on subscription tier.
-    Returns: (can_continue, questions_remaining, is_subscriber, daily_limit)
+    Work out a user's daily question limit from their subscription.
+    Returns: (is_subscriber, daily_limit) where daily_limit is -1 for unlimited
     
     Tier limits:
     - Free: 50/day
@@ -964,84 +1127,110 @@ async def check_daily_question_limit(user_id: str) -> tuple:
     - Quarterly: Unlimited
     - Annual: Unlimited
     """
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
-    if not user:
-        return False, 0, False, 50
-    
-    # Check subscription status and plan
     # The system uses subscription_plan for the tier name (weekly, monthly, etc.)
     # and subscription_status for active/free_grant/free
-    subscription_status = user.get('subscription_status', 'free')
-    subscription_plan = user.get('subscription_plan', 'free') or 'free'
+    plan = user.get('subscription_plan') or 'free'
     
-    # User is a subscriber if they have an active subscription or free grant
-    is_subscriber = subscription_status in ['active', 'free_grant'] and subscription_plan != 'free'
+    # User is a subscriber if they have an active subscription or free grant;
+    # everyone else is limited as free
+    is_subscriber = plan != 'free' and user.get('subscription_status') in SUBSCRIBED_STATUSES
     
-    # Determine the effective tier for limits
-    if is_subscriber:
-        effective_tier = subscription_plan
-    else:
-        effective_tier = 'free'
+    return is_subscriber, DAILY_LIMITS_BY_TIER.get(plan, 50) if is_subscriber else DAILY_LIMITS_BY_TIER['free']
+
+async def check_daily_question_limit(user_id: str) -> tuple:
+    """
+    Check if user has exceeded their daily question limit based on subscription tier.
+    Returns: (can_continue, questions_remaining, is_subscriber, daily_limit)
+    """
+    today = datetime.utcnow().date().isoformat()
     
-    # Get daily limit for this tier
-    daily_limit = DAILY_LIMITS_BY_TIER.get(effective_tier, 50)
+    # Plan and today's usage are independent reads, so fetch them together
+    user, daily_usage = await asyncio.gather(
+        db.users.find_one(
+            {"id": user_id},
+            {"_id": 0, "subscription_status": 1, "subscription_plan": 1}
+        ),
+        db.daily_usage.find_one(
+            {"user_id": user_id, "date": today},
+            {"_id": 0, "questions_viewed": 1}
+        )
+    )
+    if not user:
+        return False, 0, False, 50
+    
+    is_subscriber, daily_limit = get_daily_limit(user)
     
     # Unlimited tiers (quarterly and annual)
     if daily_limit == -1:
         return True, -1, True, -1
     
-    today = datetime.utcnow().date().isoformat()
-    
-    # Get or create daily usage record
-    daily_usage = await db.daily_usage.find_one({
-        "user_id": user_id,
-        "date": today
-    }, {"_id": 0})
-    
-    if not daily_usage:
-        # First question of the day
-        await db.daily_usage.insert_one({
-            "user_id": user_id,
-            "date": today,
-            "questions_viewed": 0,
-            "created_at": datetime.utcnow().isoformat()
-        })
-        return True, daily_limit, is_subscriber, daily_limit
-    
-    questions_viewed = daily_usage.get('questions_viewed', 0)
+    questions_viewed = daily_usage.get('questions_viewed', 0) if daily_usage else 0
     questions_remaining = max(0, daily_limit - questions_viewed)
     
     return questions_remaining > 0, questions_remaining, is_subscriber, daily_limit
 
-async def increment_daily_usage(user_id: str, count: int = 1):
-    """Increment the daily question count for a user."""
+async def consume_daily_question(user_id: str) -> tuple:
+    """
+    Count one question against the user's daily limit, atomically.
+    Returns: (allowed, questions_remaining, is_subscriber, daily_limit)
+    
+    The counter is incremented with a single upserting find_one_and_update, so
+    concurrent answers can't both slip through as the last allowed question.
+    A rejected attempt is taken back off the counter.
+    """
+    user = await db.users.find_one(
+        {"id": user_id},
+        {"_id": 0, "subscription_status": 1, "subscription_plan": 1}
+    )
+    if not user:
+        return False, 0, False, 50
+    
+    is_subscriber, daily_limit = get_daily_limit(user)
+    
+    # Unlimited tiers (quarterly and annual) are not counted
+    if daily_limit == -1:
+        return True, -1, True, -1
+    
     today = datetime.utcnow().date().isoformat()
-    await db.daily_usage.update_one(
+    usage = await db.daily_usage.find_one_and_update(
         {"user_id": user_id, "date": today},
         {
-            "$inc": {"questions_viewed": count},
-            "$setOnInsert": {
-                "user_id": user_id,
-                "date": today,
-                "created_at": datetime.utcnow().isoformat()
-            }
+            "$inc": {"questions_viewed": 1},
+            "$setOnInsert": {"created_at": datetime.utcnow()}
         },
-        upsert=True
+        projection={"_id": 0, "questions_viewed": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    
+    questions_viewed = usage['questions_viewed']
+    if questions_viewed > daily_limit:
+        await db.daily_usage.update_one(
+            {"user_id": user_id, "date": today},
+            {"$inc": {"questions_viewed": -1}}
+        )
+        return False, 0, is_subscriber, daily_limit
+    
+    return True, daily_limit - questions_viewed, is_subscriber, daily_limit
 
 async def get_user_study_year(user_id: str) -> int:
     """Get user's current study year. Default to 2 if not set."""
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
+    cached = _study_year_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "current_year": 1})
     if not user:
         return 2
-    return user.get('current_year') or 2  # Default to year 2
+    study_year = _study_year_cache[user_id] = user.get('current_year') or 2  # Default to year 2
+    return study_year
 
 async def get_user_category_progress(user_id: str, category: str) -> dict:
     """Get user's progress in a specific category to determine complexity level."""
     progress = await db.category_progress.find_one({
         "user_id": user_id,
         "category": category
-    }, {"_id": 0})
+    }, {"_id": 0, "mastered_level": 1, "current_level": 1})
     
     if not progress:
         return {"mastered_level": 0, "current_level": 1}  # Start at foundational
@@ -1080,21 +1269,15 @@ async def get_questions(
     # NOTE: Daily limit is now checked when ANSWERING questions, not when fetching
     # This allows users to view questions but tracks actual usage
     
-    # Check user's unlock status
-    full_bank_unlocked, qualifying_sessions = await get_user_unlock_status(user_id)
-    
-    # Get user's study year for filtering
-    user_study_year = await get_user_study_year(user_id)
+    # Check user's unlock status and study year (for filtering) together
+    (full_bank_unlocked, qualifying_sessions), user_study_year = await asyncio.gather(
+        get_user_unlock_status(user_id),
+        get_user_study_year(user_id)
+    )
     
     # Start building query with $and to properly combine tenant filter with other filters
     # Tenant filter - questions must belong to this tenant or be global
-    tenant_filter = {
-        '$or': [
-            {'tenant_id': tenant_id},
-            {'tenant_id': {'$exists': False}},  # Legacy questions without tenant_id
-            {'tenant_id': None}  # Global questions
-        ]
-    }
+    tenant_filter = question_tenant_filter(tenant_id)
     
     # Build additional filters
     additional_filters = []
@@ -1149,26 +1332,27 @@ async def get_questions(
         '$and': [tenant_filter] + additional_filters
     }
     
-    questions = await db.questions.find(query, {"_id": 0}).to_list(limit * 3)
+    if limit < 1:
+        return []
+    
+    # Let the server pick `limit` random matches ($match first so it can use indexes)
+    questions = await db.questions.aggregate([
+        {'$match': query},
+        {'$sample': {'size': limit}},
+        {'$project': {'_id': 0}}
+    ]).to_list(limit)
     
     # Convert datetime strings
     for q in questions:
         if isinstance(q.get('created_at'), str):
             q['created_at'] = datetime.fromisoformat(q['created_at'])
     
-    # Randomize question order
-    random.shuffle(questions)
-    
-    # Limit results
-    questions = questions[:limit]
-    
     # NOTE: Daily usage is now tracked when answering questions, not when fetching
     # This prevents counting all fetched questions against the limit
     
     # Randomize answer options for each question
     randomized_questions = []
-    for q in questions:
-        new_options, new_correct, _ = randomize_answer_options(q)
+    for q, (new_options, new_correct, _) in zip(questions, randomize_answer_options(questions)):
         q['options'] = new_options
         q['correct_answer'] = new_correct
         randomized_questions.append(Question(**q))
@@ -1214,13 +1398,7 @@ async def get_adaptive_questions(
     progress_obj = UserProgress(**progress)
     
     # Build query with tenant filter
-    tenant_filter = {
-        '$or': [
-            {'tenant_id': tenant_id},
-            {'tenant_id': {'$exists': False}},
-            {'tenant_id': None}
-        ]
-    }
+    tenant_filter = question_tenant_filter(tenant_id)
     
     if not full_bank_unlocked:
         query = {'source': 'une_priority', **tenant_filter}
@@ -1263,14 +1441,16 @@ async def get_adaptive_questions(
             random.shuffle(questions_obj)
             selected = questions_obj[:count]
     
-    # Randomize answer options for each question
+    # Randomize answer options for each question; the selected models are already
+    # validated, so copy them with the new order instead of dumping and re-validating
     randomized_questions = []
-    for q in selected:
-        q_dict = q.model_dump()
-        new_options, new_correct, _ = randomize_answer_options(q_dict)
-        q_dict['options'] = new_options
-        q_dict['correct_answer'] = new_correct
-        randomized_questions.append(Question(**q_dict))
+    shuffled = randomize_answer_options(
+        [{'options': q.options, 'correct_answer': q.correct_answer} for q in selected]
+    )
+    for q, (new_options, new_correct, _) in zip(selected, shuffled):
+        randomized_questions.append(
+            q.model_copy(update={'options': new_options, 'correct_answer': new_correct})
+        )
     
     return randomized_questions
 
@@ -1282,8 +1462,8 @@ async def submit_answer(
     tenant_id: str = Depends(get_current_tenant)
 ):
     """Submit an answer and update progress with tenant awareness."""
-    # Check daily limit based on subscription tier BEFORE processing the answer
-    can_continue, questions_remaining, is_subscriber, daily_limit = await check_daily_question_limit(user_id)
+    # Count the answer against the daily limit (by subscription tier) BEFORE processing it
+    can_continue, questions_remaining, is_subscriber, daily_limit = await consume_daily_question(user_id)
     
     if not can_continue:
         raise HTTPException(
@@ -1291,10 +1471,6 @@ async def submit_answer(
             detail="Daily question limit reached. Upgrade your subscription for more questions!"
         )
     
-    # Increment daily usage for users with limits (not quarterly/annual)
-    if daily_limit != -1:
-        await increment_daily_usage(user_id, 1)
-    
     # Get question
     question = await db.questions.find_one({"id": answer.question_id}, {"_id": 0})
     if not question:
@@ -1318,39 +1494,36 @@ async def submit_answer(
     # Process answer with adaptive engine
     updated_progress = adaptive_engine.process_answer(progress_obj, answer, question_obj)
     
-    # Update database
+    # Update database: progress, answer history and today's study session are
+    # independent collections, so the three writes go out together
     progress_dict = updated_progress.model_dump()
-    progress_dict['last_activity'] = progress_dict['last_activity'].isoformat()
-    
-    await db.user_progress.update_one(
-        {"user_id": user_id},
-        {"$set": progress_dict},
-        upsert=True
-    )
     
     # Record answer in history
     answer_dict = answer.model_dump()
     answer_dict['user_id'] = user_id
-    answer_dict['timestamp'] = answer_dict['timestamp'].isoformat()
-    await db.answer_history.insert_one(answer_dict)
     
-    # Update today's study session
     today = datetime.utcnow().date().isoformat()
-    await db.study_sessions.update_one(
-        {"user_id": user_id, "date": today},
-        {
-            "$inc": {
-                "questions_answered": 1,
-                "correct_answers": 1 if answer.is_correct else 0,
-                "time_spent": answer.time_taken
+    await asyncio.gather(
+        db.user_progress.update_one(
+            {"user_id": user_id},
+            {"$set": progress_dict},
+            upsert=True
+        ),
+        db.answer_history.insert_one(answer_dict),
+        db.study_sessions.update_one(
+            {"user_id": user_id, "date": today},
+            {
+                "$inc": {
+                    "questions_answered": 1,
+                    "correct_answers": 1 if answer.is_correct else 0,
+                    "time_spent": answer.time_taken
+                },
+                "$addToSet": {"categories_studied": question_obj.category.value}
             },
-            "$addToSet": {"categories_studied": question_obj.category.value}
-        },
-        upsert=True
+            upsert=True
+        )
     )
-    
-    # Calculate remaining questions (decrement by 1 if has limit)
-    new_remaining = questions_remaining - 1 if daily_limit != -1 else -1
+    _unlock_status_cache.pop(user_id, None)
     
     return {
         "success": True,
@@ -1359,7 +1532,7 @@ async def submit_answer(
             CategoryProgress(category=question_obj.category)
         ).current_difficulty,
         "current_streak": updated_progress.current_streak,
-        "questions_remaining": new_remaining,
+        "questions_remaining": questions_remaining,
         "daily_limit": daily_limit
     }
 
@@ -1409,6 +1582,9 @@ async def import_questions(
 ):
     """Import questions from Excel/CSV/Word/PDF file with duplicate detection and tenant assignment."""
     try:
+        # pandas is only needed here and for the UNE import, so load it lazily
+        import pandas as pd
+        
         # Read file
         contents = await file.read()
         filename_lower = file.filename.lower()
@@ -1605,7 +1781,6 @@ async def report_question(
     report.tenant_id = tenant_id  # Multi-tenant: assign to current tenant
     
     report_dict = report.model_dump()
-    report_dict['timestamp'] = report_dict['timestamp'].isoformat()
     report_dict['status'] = 'pending'  # Add status field
     
     await db.question_reports.insert_one(report_dict)
@@ -1616,7 +1791,8 @@ async def report_question(
     
     # Send email notification to support
     if question and user:
-        send_question_report_notification(
+        send_in_background(
+            send_question_report_notification,
             question_id=report.question_id,
             question_text=question.get('question', 'N/A'),
             report_reason=report.reason,
@@ -1703,6 +1879,7 @@ async def generate_ai_questions(
     
     return AIGenerationResponse(
         questions=questions,
+        requested_count=request.question_count,
         usage_count=updated_user['ai_daily_uses'],
         remaining_daily_uses=updated_user['ai_max_daily_uses'] - updated_user['ai_daily_uses']
     )
@@ -1808,11 +1985,7 @@ async def get_subcategory_analytics(
     question_ids = [a.get('question_id') for a in answers if a.get('question_id')]
     questions = await db.questions.find({
         "id": {"$in": question_ids},
-        "$or": [
-            {"tenant_id": tenant_id},
-            {"tenant_id": {"$exists": False}},
-            {"tenant_id": None}
-        ]
+        **question_tenant_filter(tenant_id)
     }, {"_id": 0}).to_list(10000)
     
     # Create question lookup
@@ -1857,7 +2030,7 @@ async def get_subcategory_analytics(
 # EXAM MODE ROUTES (Tenant-Aware)
 # ============================================================================
 
-@api_router.post("/exam/start", response_model=ExamSession)
+@api_router.post("/exam/start", response_model=ExamSessionResponse)
 async def start_exam(
     request: Request,
     question_count: int = 50,
@@ -1876,13 +2049,7 @@ async def start_exam(
     full_bank_unlocked, _ = await get_user_unlock_status(user_id)
     
     # Build query with tenant filter
-    tenant_filter = {
-        '$or': [
-            {'tenant_id': tenant_id},
-            {'tenant_id': {'$exists': False}},
-            {'tenant_id': None}
-        ]
-    }
+    tenant_filter = question_tenant_filter(tenant_id)
     
     if not full_bank_unlocked:
         query = {'source': 'une_priority', 'quarantined': {'$ne': True}, **tenant_filter}
@@ -1899,12 +2066,11 @@ async def start_exam(
     selected = questions[:question_count]
     
     # Randomize answer options and store mappings
-    answer_mappings = {}
-    for q in selected:
-        new_options, new_correct, original_indices = randomize_answer_options(q)
+    permutations = []
+    for q, (new_options, new_correct, original_indices) in zip(selected, randomize_answer_options(selected)):
         q['options'] = new_options
         q['correct_answer'] = new_correct
-        answer_mappings[q['id']] = original_indices
+        permutations.append(original_indices)
     
     # Create exam session with tenant_id
     exam = ExamSession(
@@ -1913,16 +2079,19 @@ async def start_exam(
         question_ids=[q['id'] for q in selected],
         answers={},
         time_limit=time_limit,
-        answer_mappings=answer_mappings,
+        answer_mappings=pack_answer_mappings(permutations),
         question_count=len(selected)
     )
     
     exam_dict = exam.model_dump()
-    exam_dict['started_at'] = exam_dict['started_at'].isoformat()
     
     await db.exam_sessions.insert_one(exam_dict)
     
-    return exam
+    # The packed mappings are for storage; clients keep getting question_id -> indices
+    return ExamSessionResponse(**{
+        **exam.model_dump(),
+        "answer_mappings": unpack_answer_mappings(exam.question_ids, exam.answer_mappings)
+    })
 
 @api_router.get("/exam/{exam_id}/questions")
 async def get_exam_questions(
@@ -1951,7 +2120,7 @@ async def get_exam_questions(
     ).to_list(1000)
     
     # Apply the same answer randomization stored in the exam session
-    answer_mappings = exam.get('answer_mappings', {})
+    answer_mappings = unpack_answer_mappings(exam['question_ids'], exam.get('answer_mappings', b''))
     
     randomized_questions = []
     for q in questions:
@@ -2005,7 +2174,7 @@ async def complete_exam(
     ).to_list(1000)
     
     # Get answer mappings for correct answer calculation
-    answer_mappings = exam.get('answer_mappings', {})
+    answer_mappings = unpack_answer_mappings(exam['question_ids'], exam.get('answer_mappings', b''))
     
     # Calculate score
     correct = 0
@@ -2038,7 +2207,9 @@ async def complete_exam(
     score = int((correct / total) * 100) if total > 0 else 0
     
     # Calculate time taken
-    started_at = datetime.fromisoformat(exam['started_at'])
+    started_at = exam['started_at']
+    if isinstance(started_at, str):
+        started_at = datetime.fromisoformat(started_at)
     time_taken = int((datetime.utcnow() - started_at).total_seconds())
     
     # Check for qualifying session (85%+ on 50+ questions)
@@ -2070,11 +2241,13 @@ async def complete_exam(
             {"$set": update_data},
             upsert=True
         )
+        _unlock_status_cache.pop(user_id, None)
         
         # Send qualifying session email notification
         user = await db.users.find_one({"id": user_id}, {"_id": 0})
         if user and user.get('email'):
-            send_qualifying_session_email(
+            send_in_background(
+                send_qualifying_session_email,
                 to_email=user['email'],
                 user_name=user.get('full_name', 'User'),
                 sessions_completed=new_qualifying,
@@ -2086,7 +2259,7 @@ async def complete_exam(
         {"id": exam_id},
         {
             "$set": {
-                "completed_at": datetime.utcnow().isoformat(),
+                "completed_at": datetime.utcnow(),
                 "score": score,
                 "is_qualifying_session": is_qualifying
             }
@@ -2112,6 +2285,12 @@ async def complete_exam(
 # DATA EXPORT ROUTES
 # ============================================================================
 
+def _export_default(value):
+    """json.dumps fallback for exports: ISO strings for stored datetimes."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
 @api_router.post("/export/data")
 async def export_user_data(
     request: DataExportRequest,
@@ -2131,7 +2310,7 @@ async def export_user_data(
             
             zip_file.writestr(
                 "questions.json",
-                json.dumps(questions, indent=2, default=str)
+                json.dumps(questions, indent=2, default=_export_default)
             )
         
         # Export progress
@@ -2140,7 +2319,7 @@ async def export_user_data(
             if progress:
                 zip_file.writestr(
                     "progress.json",
-                    json.dumps(progress, indent=2, default=str)
+                    json.dumps(progress, indent=2, default=_export_default)
                 )
         
         # Export sessions
@@ -2148,14 +2327,14 @@ async def export_user_data(
             sessions = await db.study_sessions.find({"user_id": user_id}, {"_id": 0}).to_list(10000)
             zip_file.writestr(
                 "sessions.json",
-                json.dumps(sessions, indent=2, default=str)
+                json.dumps(sessions, indent=2, default=_export_default)
             )
         
         # Export answer history
         answers = await db.answer_history.find({"user_id": user_id}, {"_id": 0}).to_list(10000)
         zip_file.writestr(
             "answer_history.json",
-            json.dumps(answers, indent=2, default=str)
+            json.dumps(answers, indent=2, default=_export_default)
         )
     
     # Prepare for download
@@ -2237,6 +2416,8 @@ async def initialize_une_questions(
 ):
     """Import UNE priority questions from the Excel file."""
     try:
+        import pandas as pd
+        
         une_file_path = ROOT_DIR / 'une_questions.xlsx'
         
         if not une_file_path.exists():
@@ -2356,13 +2537,7 @@ async def get_question_bank_stats(
     tenant_id: str = Depends(get_current_tenant)
 ):
     """Get statistics about question banks for the current tenant."""
-    tenant_filter = {
-        "$or": [
-            {"tenant_id": tenant_id},
-            {"tenant_id": {"$exists": False}},
-            {"tenant_id": None}
-        ]
-    }
+    tenant_filter = question_tenant_filter(tenant_id)
     
     une_count = await db.questions.count_documents({"source": "une_priority", **tenant_filter})
     total_count = await db.questions.count_documents(tenant_filter)
@@ -2379,10 +2554,21 @@ async def get_question_bank_stats(
 # ADMIN ROUTES (Tenant-Aware)
 # ============================================================================
 
+# user_id -> is_admin, so admin pages don't re-read the user on every request.
+# Changes made through this process are evicted immediately; elsewhere they apply within the TTL.
+ADMIN_CACHE_TTL_SECONDS = 60
+_admin_cache = TTLCache(maxsize=1024, ttl=ADMIN_CACHE_TTL_SECONDS)
+
 async def verify_admin(user_id: str) -> bool:
     """Verify if user is an admin."""
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
-    return user and user.get('is_admin', False)
+    cached = _admin_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "is_admin": 1})
+    is_admin = bool(user and user.get('is_admin', False))
+    _admin_cache[user_id] = is_admin
+    return is_admin
 
 @api_router.get("/admin/users")
 async def admin_get_users(
@@ -2460,7 +2646,8 @@ async def admin_grant_access(
         raise HTTPException(status_code=400, detail="user_id is required")
     
     # Calculate end date
-    end_date = datetime.utcnow() + timedelta(days=duration_days)
+    start_date = datetime.utcnow()
+    end_date = start_date + timedelta(days=duration_days)
     
     # AI limits based on subscription (50% of cost budget)
     ai_limits = {
@@ -2483,10 +2670,10 @@ async def admin_grant_access(
         "to_plan": subscription_plan,
         "granted_by": user_id,
         "grant_type": "free_grant",
-        "start_date": datetime.utcnow().isoformat(),
-        "end_date": end_date.isoformat(),
+        "start_date": start_date,
+        "end_date": end_date,
         "duration_days": duration_days,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": start_date
     })
     
     # Update user
@@ -2496,8 +2683,8 @@ async def admin_grant_access(
             "subscription_status": "free_grant",
             "subscription_plan": subscription_plan,
             "subscription_tier": subscription_plan,  # Also set tier for consistency
-            "subscription_start": datetime.utcnow().isoformat(),
-            "subscription_end": end_date.isoformat(),
+            "subscription_start": start_date,
+            "subscription_end": end_date,
             "ai_max_daily_uses": ai_limits.get(subscription_plan, 10)
         }}
     )
@@ -2528,7 +2715,7 @@ async def admin_revoke_access(
             "from_plan": target_user.get('subscription_plan'),
             "to_plan": "free",
             "revoked_by": user_id,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         })
     
     # Update user
@@ -2570,6 +2757,8 @@ async def admin_toggle_admin(
         {"$set": {"is_admin": is_admin}}
     )
     
+    _admin_cache.pop(target_user_id, None)
+    
     return {"success": True, "message": f"Admin access {'granted' if is_admin else 'revoked'}"}
 
 @api_router.post("/admin/bootstrap")
@@ -2610,6 +2799,8 @@ async def bootstrap_admin(
         {"$set": {"is_admin": True, "email_verified": True}}
     )
     
+    _admin_cache.pop(user["id"], None)
+    
     # Verify the update worked
     updated_user = await db.users.find_one({"id": user["id"]})
     
@@ -2945,17 +3136,14 @@ async def submit_contact_form(data: dict):
     await db.contact_submissions.insert_one(contact_entry)
     
     # Send email notification to support
-    email_sent = send_contact_form_notification(
+    send_in_background(
+        send_contact_form_notification,
         sender_name=name,
         sender_email=email,
         subject=subject,
         message=message
     )
-    
-    if email_sent:
-        logger.info(f"Contact form submitted by {email}, notification sent to support")
-    else:
-        logger.warning(f"Contact form submitted by {email}, but notification email failed")
+    logger.info(f"Contact form submitted by {email}, notification queued for support")
     
     return {"success": True, "message": "Thank you for your message! We will get back to you within 24 hours."}
 
@@ -12,6 +12,7 @@ from datetime import datetime
 import uuid
 from functools import lru_cache
 import logging
+from cachetools import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -87,16 +88,19 @@ DEFAULT_TENANT = TenantConfig(
 )
 
 
-# In-memory cache for tenant lookups (cleared on updates)
-_tenant_cache = {}
-_tenant_cache_by_id = {}
+# In-memory cache for tenant lookups (cleared on updates). Entries expire after
+# TENANT_CACHE_TTL_SECONDS so changes made by other workers are picked up; unknown
+# domains are cached as None so arbitrary Host headers don't each cost a query.
+TENANT_CACHE_TTL_SECONDS = 300
+_tenant_cache = TTLCache(maxsize=256, ttl=TENANT_CACHE_TTL_SECONDS)
+_tenant_cache_by_id = TTLCache(maxsize=256, ttl=TENANT_CACHE_TTL_SECONDS)
+_MISSING = object()
 
 
 def clear_tenant_cache():
     """Clear the tenant cache after updates."""
-    global _tenant_cache, _tenant_cache_by_id
-    _tenant_cache = {}
-    _tenant_cache_by_id = {}
+    _tenant_cache.clear()
+    _tenant_cache_by_id.clear()
     logger.info("Tenant cache cleared")
 
 
@@ -112,8 +116,9 @@ async def get_tenant_by_domain(db, domain: str) -> Optional[TenantConfig]:
         TenantConfig if found, None otherwise
     """
     # Check cache first
-    if domain in _tenant_cache:
-        return _tenant_cache[domain]
+    cached = _tenant_cache.get(domain, _MISSING)
+    if cached is not _MISSING:
+        return cached
     
     # Query database
     tenant_doc = await db.tenants.find_one({"domain": domain, "is_active": True}, {"_id": 0})
@@ -124,6 +129,7 @@ async def get_tenant_by_domain(db, domain: str) -> Optional[TenantConfig]:
         _tenant_cache_by_id[tenant.tenant_id] = tenant
         return tenant
     
+    _tenant_cache[domain] = None
     return None
 
 
@@ -139,8 +145,9 @@ async def get_tenant_by_id(db, tenant_id: str) -> Optional[TenantConfig]:
         TenantConfig if found, None otherwise
     """
     # Check cache first
-    if tenant_id in _tenant_cache_by_id:
-        return _tenant_cache_by_id[tenant_id]
+    cached = _tenant_cache_by_id.get(tenant_id, _MISSING)
+    if cached is not _MISSING:
+        return cached
     
     # Query database
     tenant_doc = await db.tenants.find_one({"tenant_id": tenant_id, "is_active": True}, {"_id": 0})
@@ -151,6 +158,7 @@ async def get_tenant_by_id(db, tenant_id: str) -> Optional[TenantConfig]:
         _tenant_cache_by_id[tenant_id] = tenant
         return tenant
     
+    _tenant_cache_by_id[tenant_id] = None
     return None
 
 